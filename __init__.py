@@ -4,22 +4,55 @@ from __future__ import annotations
 
 from collections.abc import Callable
 from dataclasses import dataclass
+from datetime import timedelta
 import logging
+from pathlib import Path
+import shutil
+import time
+from typing import TYPE_CHECKING
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers.device_registry import DeviceEntry
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.importlib import async_import_module
+from homeassistant.helpers.storage import Store
 
-from .const import DOMAIN
-from .coordinator import PiwigoWallDisplayCoordinator
+from .const import (
+    DOMAIN,
+    INDEX_SYNC_INTERVAL,
+    SNAPSHOT_STORAGE_KEY,
+    SNAPSHOT_STORAGE_VERSION,
+)
+
+if TYPE_CHECKING:
+    from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+    from .profiles import ProfileStore
+    from .sampler import ImageEngine
 
 _LOGGER = logging.getLogger(__name__)
 
+# Modules every entry sets up with.  They pull in requests, so they are
+# imported in the executor on first setup rather than with the integration.
+# The image index and profiler are imported on first use.
+RUNTIME_MODULES = [
+    "coordinator",
+    "profiles",
+    "push",
+    "sampler",
+    "services",
+]
+
 
-PLATFORMS: list[Platform] = [Platform.SELECT, Platform.SWITCH]
+PLATFORMS: list[Platform] = [
+    Platform.IMAGE,
+    Platform.SELECT,
+    Platform.SENSOR,
+    Platform.SWITCH,
+]
 
 
 @dataclass
@@ -28,10 +61,24 @@ class RuntimeData:
 
     coordinator: DataUpdateCoordinator
     cancel_update_listener: Callable
+    profiles: ProfileStore
+    images: ImageEngine
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up Piwigo Wall Display Integration from a config entry."""
+    # pylint: disable=import-outside-toplevel
+    start = time.perf_counter()
+    for module in RUNTIME_MODULES:
+        await async_import_module(hass, f"{__name__}.{module}")
+    imported = time.perf_counter()
+
+    # Already imported above, so these are only lookups.
+    from .coordinator import PiwigoWallDisplayCoordinator
+    from .profiles import ProfileStore
+    from .push import async_register_webhook
+    from .sampler import ImageEngine
+    from .services import async_setup_services
 
     hass.data.setdefault(DOMAIN, {})
 
@@ -39,29 +86,90 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     # This is defined in coordinator.py
     coordinator = PiwigoWallDisplayCoordinator(hass, config_entry)
 
-    # Perform an initial data load from api.
-    # async_config_entry_first_refresh() is special in that it does not log errors if it fails
-    await coordinator.async_config_entry_first_refresh()
-
-    # Test to see if api initialised correctly, else raise ConfigNotReady to make HA retry setup
-    # TODO: Change this to match how your api will know if connected or successful update
-    if not coordinator.api.connected:
-        raise ConfigEntryNotReady
+    # Start from the full_table stored by the last run and refresh in the
+    # background, so the platforms do not wait on Piwigo.  The first start has
+    # no snapshot and waits for a refresh.
+    if await coordinator.async_load_snapshot():
+        source = "snapshot"
+        config_entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} first refresh"
+        )
+    else:
+        source = "refresh"
+        # Perform an initial data load from api.
+        # async_config_entry_first_refresh() is special in that it does not log errors if it fails
+        await coordinator.async_config_entry_first_refresh()
+
+        # Test to see if api initialised correctly, else raise ConfigNotReady to make HA retry setup
+        # TODO: Change this to match how your api will know if connected or successful update
+        if not coordinator.api.connected:
+            raise ConfigEntryNotReady
+    data_ready = time.perf_counter()
+
+    # Receive change notifications from Piwigo, polling becomes a safety net
+    # while they keep arriving.  This may store a new webhook id on the entry,
+    # so it runs before the update listener below is added.
+    async_register_webhook(hass, config_entry, coordinator)
 
     # Initialise a listener for config flow options changes.
     # See config_flow for defining an options setting that shows up as configure on the integration.
     cancel_update_listener = config_entry.add_update_listener(_async_update_listener)
 
+    # Load the locally stored selection profiles for this entry.
+    profiles = ProfileStore(hass, config_entry.entry_id)
+    await profiles.async_load()
+
+    # Keep the local image index synced in the background, it is opened by
+    # the first sync.
+    coordinator.image_index_path = hass.config.path(
+        DOMAIN, f"{config_entry.entry_id}.sqlite3"
+    )
+
+    async def _async_sync_index(*_) -> None:
+        """Sync the image index, logging rather than raising errors."""
+        try:
+            await coordinator.async_sync_index()
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning("Error syncing the image index: %s", err)
+
+    config_entry.async_on_unload(
+        async_track_time_interval(
+            hass, _async_sync_index, timedelta(seconds=INDEX_SYNC_INTERVAL)
+        )
+    )
+    config_entry.async_create_background_task(
+        hass, _async_sync_index(), f"{DOMAIN} image index sync"
+    )
+
+    # Start the random image sampler over the enabled albums or tags.
+    images = ImageEngine(hass, coordinator, config_entry)
+    await images.async_setup()
+
     # Add the coordinator and update listener to hass data to make
     # accessible throughout your integration
     # Note: this will change on HA2024.6 to save on the config entry.
     hass.data[DOMAIN][config_entry.entry_id] = RuntimeData(
-        coordinator, cancel_update_listener
+        coordinator, cancel_update_listener, profiles, images
     )
 
     # Setup platforms (based on the list of entity types in PLATFORMS defined above)
     # This calls the async_setup method in each of your entity type files.
+    platforms_start = time.perf_counter()
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    done = time.perf_counter()
+
+    coordinator.setup_stats["entry"] = {
+        "source": source,
+        "import_seconds": round(imported - start, 4),
+        "data_seconds": round(data_ready - imported, 4),
+        "platforms_seconds": round(done - platforms_start, 4),
+        "setup_seconds": round(done - start, 4),
+    }
+    _LOGGER.debug("Entry setup: %s", coordinator.setup_stats["entry"])
+
+    # Register the services shared by all entries, and start or retune the
+    # event loop watchdog for this entry's stall threshold.
+    await async_setup_services(hass)
 
     # Return true to denote a successful setup.
     return True
@@ -87,10 +195,15 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     """Unload a config entry."""
     # This is called when you remove your integration or shutdown HA.
     # If you have created any custom services, they need to be removed here too.
+    # pylint: disable=import-outside-toplevel
+    from .services import async_unload_services
 
     # Remove the config options update listener
     hass.data[DOMAIN][config_entry.entry_id].cancel_update_listener()
 
+    # Stop following the coordinator, the push webhook is removed by async_on_unload
+    hass.data[DOMAIN][config_entry.entry_id].images.async_unload()
+
     # Unload platforms
     unload_ok = await hass.config_entries.async_unload_platforms(
         config_entry, PLATFORMS
@@ -98,7 +211,27 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
 
     # Remove the config entry from the hass data object.
     if unload_ok:
-        hass.data[DOMAIN].pop(config_entry.entry_id)
+        runtime_data = hass.data[DOMAIN].pop(config_entry.entry_id)
+        await runtime_data.coordinator.async_close_index()
+        await async_unload_services(hass)
 
     # Return that unloading was successful.
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Delete the image cache, image index and snapshot of a removed entry."""
+    await hass.async_add_executor_job(
+        _remove_entry_files, Path(hass.config.path(DOMAIN)), config_entry.entry_id
+    )
+    await Store(
+        hass,
+        SNAPSHOT_STORAGE_VERSION,
+        SNAPSHOT_STORAGE_KEY.format(config_entry.entry_id),
+    ).async_remove()
+
+
+def _remove_entry_files(directory: Path, entry_id: str) -> None:
+    """Delete an entry's cached images and index database, run in the executor."""
+    shutil.rmtree(directory / entry_id, ignore_errors=True)
+    (directory / f"{entry_id}.sqlite3").unlink(missing_ok=True)
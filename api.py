@@ -5,6 +5,7 @@ This is the main API code that reaches out to the PIWIGO server to get and set t
 
 from dataclasses import dataclass
 from enum import StrEnum
+import json
 import logging
 from typing import Any
 
@@ -39,14 +40,27 @@ class Device:
 class API:
     """Class for example API."""
 
-    def __init__(self, host: str, user: str, pwd: str) -> None:
-        """Initialise."""
+    def __init__(
+        self, host: str, user: str, pwd: str, timeout: float | None = None
+    ) -> None:
+        """Initialise, timeout limits the login and full_table requests."""
         self.host = host
         self.user = user
         self.pwd = pwd
+        self.timeout = timeout
         self.connected: bool = False
         self.session = requests.Session()
 
+    def clone(self) -> "API":
+        """Return an API with its own session, logged in as this one.
+
+        Sessions are not thread safe, give every thread its own clone.
+        """
+        api = API(self.host, self.user, self.pwd, self.timeout)
+        api.session.cookies.update(self.session.cookies)
+        api.connected = self.connected
+        return api
+
     @property
     def controller_name(self) -> str:
         """Return the name of the controller."""
@@ -61,7 +75,9 @@ class API:
         """Connect to api."""
         login_data = {"username": self.user, "password": self.pwd}
         r = self.session.post(
-            self.host + "/ws.php?format=json&method=pwg.session.login", data=login_data
+            self.host + "/ws.php?format=json&method=pwg.session.login",
+            data=login_data,
+            timeout=self.timeout,
         )
         if r.json()["stat"] == "ok":
             self.connected = True
@@ -86,23 +102,38 @@ class API:
         result = self.session.get(full_url)
         if result.text == "Not Logged In":
             connected = self.connect()
-            result - self.session.get(full_url)
+            result = self.session.get(full_url)
         return False
 
+    def set_many(self, changes: list[tuple[Device, Any]]) -> int:
+        """Set api data for several devices over one logged in session.
+
+        Returns the number of changes sent.
+        """
+        if not changes:
+            return 0
+        self.connect()
+        for device, value in changes:
+            self.set_data(device, value)
+        return len(changes)
+
     def getData(self):
         """Return 2 dictionaris of name:id.  First is albums, 2nd is tags."""
-        album_list = []
-        tag_list = []
-        full_list = []
+        return self.parse_full_table(json.loads(self.get_full_table()))
+
+    def get_full_table(self) -> bytes:
+        """Download the raw full_table payload, logging in if needed."""
         full_url = (
             self.host + "/plugins/WallDisplay/api_wall_display.inc.php?api=full_table"
         )
-        full_list = self.session.get(full_url)
+        full_list = self.session.get(full_url, timeout=self.timeout)
         if full_list.text == "Not Logged In":
             connected = self.connect()
-            full_list = self.session.get(full_url)
+            full_list = self.session.get(full_url, timeout=self.timeout)
+        return full_list.content
 
-        full_list_dict = full_list.json()
+    def parse_full_table(self, full_list_dict: dict[str, Any]) -> list[Device]:
+        """Turn a full_table payload into album, tag and mode devices."""
         album_dict = full_list_dict["cats"]
         tag_dict = full_list_dict["tags"]
         mode = full_list_dict["mode"]
@@ -120,6 +151,7 @@ class API:
                     state=device.get("Enabled") != "0",
                     piwigo_type="tag",
                     simple_name=device.get("name"),
+                    piwigo_id=int(device.get("id")),
                 )
             )
         album_list.extend(tag_list)
@@ -137,6 +169,98 @@ class API:
         )
         return album_list
 
+    def ws_call(self, method: str, params: dict[str, Any]) -> dict[str, Any]:
+        """Call a Piwigo web service method and return its result."""
+        if not self.connected:
+            self.connect()
+        response = self.session.get(
+            self.host + "/ws.php",
+            params={"format": "json", "method": method, **params},
+        )
+        body = response.json()
+        if body.get("stat") != "ok":
+            raise APIConnectionError(f"{method} failed: {body.get('message')}")
+        return body["result"]
+
+    def ensure_logged_in(self) -> None:
+        """Log in again if the Piwigo session has expired.
+
+        Listings of a guest session silently leave out private images.
+        """
+        if self.ws_call("pwg.session.getStatus", {}).get("status") == "guest":
+            self.connected = False
+            self.connect()
+
+    def get_album_image_ids(self, album_id: int, page_size: int = 500) -> list[int]:
+        """Return the ids of the images in an album and its sub-albums."""
+        return self._paged_image_ids(
+            "pwg.categories.getImages",
+            {"cat_id": album_id, "recursive": "true"},
+            page_size,
+        )
+
+    def get_tag_image_ids(self, tag_id: int, page_size: int = 500) -> list[int]:
+        """Return the ids of the images with a tag."""
+        return self._paged_image_ids(
+            "pwg.tags.getImages", {"tag_id": tag_id}, page_size
+        )
+
+    def get_image_derivative(self, image_id: int, width: int, height: int) -> bytes:
+        """Download the smallest derivative big enough to fill width x height.
+
+        An image fills the display once either side reaches it, the other side
+        is letterboxed.  Falls back to the largest derivative.
+        """
+        derivatives = self.ws_call("pwg.images.getInfo", {"image_id": image_id})[
+            "derivatives"
+        ]
+        sizes = sorted(
+            (
+                derivative
+                for derivative in derivatives.values()
+                if derivative.get("url") and derivative.get("width")
+            ),
+            key=lambda d: int(d["width"]) * int(d["height"]),
+        )
+        if not sizes:
+            raise APIConnectionError(f"Image {image_id} has no derivatives")
+        chosen = next(
+            (
+                d
+                for d in sizes
+                if int(d["width"]) >= width or int(d["height"]) >= height
+            ),
+            sizes[-1],
+        )
+        response = self.session.get(chosen["url"])
+        response.raise_for_status()
+        return response.content
+
+    def _paged_image_ids(
+        self, method: str, params: dict[str, Any], page_size: int
+    ) -> list[int]:
+        """Collect image ids from every page of an image listing method."""
+        image_ids: list[int] = []
+        page = 0
+        while True:
+            images, _ = self.get_images_page(method, params, page, page_size)
+            image_ids.extend(int(image["id"]) for image in images)
+            if len(images) < page_size:
+                return image_ids
+            page += 1
+
+    def get_images_page(
+        self, method: str, params: dict[str, Any], page: int, page_size: int
+    ) -> tuple[list[dict[str, Any]], int | None]:
+        """Return one page of an image listing method and the total count."""
+        result = self.ws_call(method, {**params, "per_page": page_size, "page": page})
+        images = result["images"]
+        if isinstance(images, dict):
+            # Older Piwigo versions wrap lists in {"_content": [...]}.
+            images = images.get("_content", [])
+        total = result.get("paging", {}).get("total_count")
+        return images, None if total is None else int(total)
+
     def flattenAlbums(self, album_dict, parent):
         """Strip everything except Album name and ID.  Sub-Albums are de-nested."""
         out_list = []
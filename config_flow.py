@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from collections.abc import Mapping
 import logging
 from typing import Any
 
@@ -23,7 +24,41 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
 
 from .api import API, APIAuthError, APIConnectionError
-from .const import DEFAULT_SCAN_INTERVAL, DOMAIN, MIN_SCAN_INTERVAL
+from .const import (
+    CONF_AGGREGATE_ENTITY,
+    CONF_BATCH_WINDOW,
+    CONF_DISPLAY_HEIGHT,
+    CONF_DISPLAY_WIDTH,
+    CONF_IMAGE_CACHE_SIZE,
+    CONF_INCLUDE_PATTERNS,
+    CONF_INDEX_CONCURRENCY,
+    CONF_INDEX_PAGE_SIZE,
+    CONF_MAX_ALBUM_DEPTH,
+    CONF_PARENT_ALBUM_IDS,
+    CONF_PROBE,
+    CONF_PUSH_SCAN_INTERVAL,
+    CONF_STALL_THRESHOLD,
+    DEFAULT_AGGREGATE_ENTITY,
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_DISPLAY_HEIGHT,
+    DEFAULT_DISPLAY_WIDTH,
+    DEFAULT_IMAGE_CACHE_SIZE,
+    DEFAULT_INCLUDE_PATTERNS,
+    DEFAULT_INDEX_CONCURRENCY,
+    DEFAULT_INDEX_PAGE_SIZE,
+    DEFAULT_MAX_ALBUM_DEPTH,
+    DEFAULT_PARENT_ALBUM_IDS,
+    DEFAULT_PUSH_SCAN_INTERVAL,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_STALL_THRESHOLD,
+    DOMAIN,
+    MAX_BATCH_WINDOW,
+    MAX_INDEX_PAGE_SIZE,
+    MIN_SCAN_INTERVAL,
+    MIN_STALL_THRESHOLD,
+    PROBE_TIMEOUT,
+)
+from .probe import probe_summary, recommend_options, run_probe
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -44,6 +79,7 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     """Validate the user input allows us to connect.
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
+    The connection is probed so the returned info also holds the probe results.
     """
     # TODO validate the data can be used to set up a connection.
 
@@ -53,16 +89,26 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     #     your_validate_func, data[CONF_USERNAME], data[CONF_PASSWORD]
     # )
 
-    api = API(data[CONF_HOST], data[CONF_USERNAME], data[CONF_PASSWORD])
+    api = API(
+        data[CONF_HOST], data[CONF_USERNAME], data[CONF_PASSWORD], PROBE_TIMEOUT
+    )
     try:
-        await hass.async_add_executor_job(api.connect)
+        probe = await hass.async_add_executor_job(run_probe, api)
         # If you cannot connect, raise CannotConnect
         # If the authentication is wrong, raise InvalidAuth
     except APIAuthError as err:
         raise InvalidAuth from err
     except APIConnectionError as err:
         raise CannotConnect from err
-    return {"title": f"Piwigo Wall Display Integration - {data[CONF_HOST]}"}
+    return {
+        "title": f"Piwigo Wall Display Integration - {data[CONF_HOST]}",
+        "probe": probe,
+    }
+
+
+def _valid_album_ids(value: str) -> bool:
+    """Return if value is a comma separated list of album ids."""
+    return all(part.strip().isdigit() for part in value.split(",") if part.strip())
 
 
 class PiwigoWallDisplayConfigFlow(ConfigFlow, domain=DOMAIN):
@@ -105,7 +151,15 @@ class PiwigoWallDisplayConfigFlow(ConfigFlow, domain=DOMAIN):
                 # and create the config entry.
                 await self.async_set_unique_id(info.get("title"))
                 self._abort_if_unique_id_configured()
-                return self.async_create_entry(title=info["title"], data=user_input)
+                # Start with the options the probe recommends for this server.
+                return self.async_create_entry(
+                    title=info["title"],
+                    data=user_input,
+                    options={
+                        **recommend_options(info["probe"]),
+                        CONF_PROBE: info["probe"],
+                    },
+                )
 
         # Show initial form.
         return self.async_show_form(
@@ -156,6 +210,47 @@ class PiwigoWallDisplayConfigFlow(ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
+    async def async_step_reauth(
+        self, entry_data: Mapping[str, Any]
+    ) -> ConfigFlowResult:
+        """Handle Piwigo rejecting the stored credentials."""
+        # Started by the coordinator raising ConfigEntryAuthFailed.
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Ask for new credentials and reload the entry with them."""
+        errors: dict[str, str] = {}
+        config_entry = self._get_reauth_entry()
+
+        if user_input is not None:
+            try:
+                await validate_input(self.hass, {**config_entry.data, **user_input})
+            except CannotConnect:
+                errors["base"] = "cannot_connect"
+            except InvalidAuth:
+                errors["base"] = "invalid_auth"
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected exception")
+                errors["base"] = "unknown"
+            else:
+                return self.async_update_reload_and_abort(
+                    config_entry, data_updates=user_input
+                )
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_USERNAME, default=config_entry.data[CONF_USERNAME]
+                    ): str,
+                    vol.Required(CONF_PASSWORD): str,
+                }
+            ),
+            errors=errors,
+        )
+
 
 class PiwigoWallDisplayOptionsFlowHandler(OptionsFlow):
     """Handles the options flow."""
@@ -164,12 +259,49 @@ class PiwigoWallDisplayOptionsFlowHandler(OptionsFlow):
         """Initialize options flow."""
         self.config_entry = config_entry
         self.options = dict(config_entry.options)
+        self.probe: dict[str, Any] | None = None
+        self.recommended: dict[str, Any] | None = None
+
+    async def _async_probe(self) -> dict[str, Any]:
+        """Probe the server once per flow and return the options it recommends."""
+        if self.recommended is not None:
+            return self.recommended
+        self.recommended = {}
+        api = API(
+            self.config_entry.data[CONF_HOST],
+            self.config_entry.data[CONF_USERNAME],
+            self.config_entry.data[CONF_PASSWORD],
+            PROBE_TIMEOUT,
+        )
+        try:
+            self.probe = await self.hass.async_add_executor_job(run_probe, api)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.debug("Error probing the Piwigo server: %s", err)
+        else:
+            self.recommended = recommend_options(self.probe)
+        return self.recommended
 
     async def async_step_init(self, user_input=None):
         """Handle options flow."""
+        errors: dict[str, str] = {}
         if user_input is not None:
-            options = self.config_entry.options | user_input
-            return self.async_create_entry(title="", data=options)
+            if not _valid_album_ids(user_input.get(CONF_PARENT_ALBUM_IDS, "")):
+                errors[CONF_PARENT_ALBUM_IDS] = "invalid_ids"
+            if 0 < user_input.get(CONF_STALL_THRESHOLD, 0) < MIN_STALL_THRESHOLD:
+                errors[CONF_STALL_THRESHOLD] = "stall_threshold_too_low"
+            if not errors:
+                options = self.config_entry.options | user_input
+                if self.probe is not None:
+                    options[CONF_PROBE] = self.probe
+                return self.async_create_entry(title="", data=options)
+            # Show the form again with what was entered.
+            self.options.update(user_input)
+
+        # Options that have not been set yet are pre-filled with what the probe
+        # recommends, saved ones are kept.  The description shows the
+        # recommendation either way.
+        recommended = await self._async_probe()
+        defaults = {**recommended, **self.options}
 
         # It is recommended to prepopulate options fields with default values if available.
         # These will be the same default values you use on your coordinator for setting variable values
@@ -178,12 +310,97 @@ class PiwigoWallDisplayOptionsFlowHandler(OptionsFlow):
             {
                 vol.Required(
                     CONF_SCAN_INTERVAL,
-                    default=self.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+                    default=defaults.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))),
+                vol.Required(
+                    CONF_BATCH_WINDOW,
+                    default=defaults.get(CONF_BATCH_WINDOW, DEFAULT_BATCH_WINDOW),
+                ): (
+                    vol.All(vol.Coerce(int), vol.Clamp(min=0, max=MAX_BATCH_WINDOW))
+                ),
+                vol.Required(
+                    CONF_PUSH_SCAN_INTERVAL,
+                    default=self.options.get(
+                        CONF_PUSH_SCAN_INTERVAL, DEFAULT_PUSH_SCAN_INTERVAL
+                    ),
                 ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))),
+                vol.Required(
+                    CONF_MAX_ALBUM_DEPTH,
+                    default=defaults.get(
+                        CONF_MAX_ALBUM_DEPTH, DEFAULT_MAX_ALBUM_DEPTH
+                    ),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=0))),
+                vol.Optional(
+                    CONF_INCLUDE_PATTERNS,
+                    default=self.options.get(
+                        CONF_INCLUDE_PATTERNS, DEFAULT_INCLUDE_PATTERNS
+                    ),
+                ): str,
+                vol.Optional(
+                    CONF_PARENT_ALBUM_IDS,
+                    default=self.options.get(
+                        CONF_PARENT_ALBUM_IDS, DEFAULT_PARENT_ALBUM_IDS
+                    ),
+                ): str,
+                vol.Required(
+                    CONF_AGGREGATE_ENTITY,
+                    default=defaults.get(
+                        CONF_AGGREGATE_ENTITY, DEFAULT_AGGREGATE_ENTITY
+                    ),
+                ): bool,
+                vol.Required(
+                    CONF_DISPLAY_WIDTH,
+                    default=self.options.get(CONF_DISPLAY_WIDTH, DEFAULT_DISPLAY_WIDTH),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=64))),
+                vol.Required(
+                    CONF_DISPLAY_HEIGHT,
+                    default=self.options.get(
+                        CONF_DISPLAY_HEIGHT, DEFAULT_DISPLAY_HEIGHT
+                    ),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=64))),
+                vol.Required(
+                    CONF_IMAGE_CACHE_SIZE,
+                    default=self.options.get(
+                        CONF_IMAGE_CACHE_SIZE, DEFAULT_IMAGE_CACHE_SIZE
+                    ),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=10))),
+                vol.Required(
+                    CONF_INDEX_CONCURRENCY,
+                    default=self.options.get(
+                        CONF_INDEX_CONCURRENCY, DEFAULT_INDEX_CONCURRENCY
+                    ),
+                ): (vol.All(vol.Coerce(int), vol.Clamp(min=1, max=16))),
+                vol.Required(
+                    CONF_INDEX_PAGE_SIZE,
+                    default=self.options.get(
+                        CONF_INDEX_PAGE_SIZE, DEFAULT_INDEX_PAGE_SIZE
+                    ),
+                ): (
+                    vol.All(
+                        vol.Coerce(int), vol.Clamp(min=10, max=MAX_INDEX_PAGE_SIZE)
+                    )
+                ),
+                vol.Required(
+                    CONF_STALL_THRESHOLD,
+                    default=self.options.get(
+                        CONF_STALL_THRESHOLD, DEFAULT_STALL_THRESHOLD
+                    ),
+                ): (vol.All(vol.Coerce(int), vol.Range(min=0))),
             }
         )
 
-        return self.async_show_form(step_id="init", data_schema=data_schema)
+        return self.async_show_form(
+            step_id="init",
+            data_schema=data_schema,
+            errors=errors,
+            description_placeholders={
+                "probe": (
+                    probe_summary(self.probe, recommended)
+                    if self.probe is not None
+                    else "The Piwigo server could not be probed."
+                )
+            },
+        )
 
 
 class CannotConnect(HomeAssistantError):
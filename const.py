@@ -4,3 +4,125 @@ DOMAIN = "piwigo_photo_display_options"
 
 DEFAULT_SCAN_INTERVAL = 60
 MIN_SCAN_INTERVAL = 10
+
+# While webhook pushes keep arriving polling drops to this safety net interval.
+CONF_PUSH_SCAN_INTERVAL = "push_scan_interval"
+DEFAULT_PUSH_SCAN_INTERVAL = 900
+
+# Switch changes made within this many seconds are sent as one batched write
+# followed by a single refresh.  0 sends every change straight away.
+CONF_BATCH_WINDOW = "batch_window"
+DEFAULT_BATCH_WINDOW = 0
+MAX_BATCH_WINDOW = 10
+
+# Connection probe results, kept in the entry options for diagnostics.
+CONF_PROBE = "probe"
+
+# The probe recommends album filters when a catalog has more albums than this.
+PROBE_MAX_ALBUM_SWITCHES = 500
+
+# Seconds each probe request may take before the server counts as unreachable.
+PROBE_TIMEOUT = 10
+
+# Seconds the login and full_table requests of a refresh may take, so entities
+# started from a stored snapshot turn unavailable soon when Piwigo is down.
+REFRESH_TIMEOUT = 30
+
+# Entity options.  Album switches can be limited so that large catalogs do not
+# create thousands of entities, the aggregate sensor covers everything.
+CONF_AGGREGATE_ENTITY = "aggregate_entity"
+CONF_INCLUDE_PATTERNS = "include_patterns"
+CONF_MAX_ALBUM_DEPTH = "max_album_depth"
+CONF_PARENT_ALBUM_IDS = "parent_album_ids"
+
+DEFAULT_AGGREGATE_ENTITY = True
+DEFAULT_INCLUDE_PATTERNS = ""
+DEFAULT_MAX_ALBUM_DEPTH = 0
+DEFAULT_PARENT_ALBUM_IDS = ""
+
+# Number of upcoming wall images kept ready by the sampler.
+DEFAULT_PREFETCH_SIZE = 10
+
+# Wall image options.  Images are downscaled to fit the display and cached on
+# disk up to the cache size in MB.
+CONF_DISPLAY_HEIGHT = "display_height"
+CONF_DISPLAY_WIDTH = "display_width"
+CONF_IMAGE_CACHE_SIZE = "image_cache_size"
+
+DEFAULT_DISPLAY_HEIGHT = 1080
+DEFAULT_DISPLAY_WIDTH = 1920
+DEFAULT_IMAGE_CACHE_SIZE = 500
+
+# Upcoming images cached ahead of time, and processes used to resize them.
+IMAGE_PREFETCH_COUNT = 3
+RESIZE_WORKERS = 2
+
+# Local image index crawl settings.  Piwigo caps per_page at 500 by default.
+CONF_INDEX_CONCURRENCY = "index_concurrency"
+CONF_INDEX_PAGE_SIZE = "index_page_size"
+
+DEFAULT_INDEX_CONCURRENCY = 4
+DEFAULT_INDEX_PAGE_SIZE = 500
+MAX_INDEX_PAGE_SIZE = 500
+
+# Incremental image index syncs run this often, in seconds.
+INDEX_SYNC_INTERVAL = 3600
+
+# Sent with the entry id when the image index has been synced.
+SIGNAL_IMAGE_INDEX_UPDATED = f"{DOMAIN}_image_index_updated_{{}}"
+
+# Integration code holding the event loop longer than this many milliseconds is
+# logged.  0 turns the watchdog off.  One watchdog runs for the integration, at
+# the lowest threshold of the loaded entries.
+CONF_STALL_THRESHOLD = "stall_threshold"
+DEFAULT_STALL_THRESHOLD = 0
+MIN_STALL_THRESHOLD = 50
+
+# hass.data key of the running loop watchdog.
+DATA_WATCHDOG = f"{DOMAIN}_watchdog"
+
+# The last full_table payload is stored at most this often, in seconds, so a
+# restart can set up entities before Piwigo answers.
+SNAPSHOT_SAVE_DELAY = 60
+SNAPSHOT_STORAGE_VERSION = 1
+SNAPSHOT_STORAGE_KEY = f"{DOMAIN}.{{}}.snapshot"
+
+# Switches are added to Home Assistant this many at a time during setup.
+SETUP_CHUNK_SIZE = 200
+
+# While switches are added the event loop lag is sampled this often, in seconds.
+SETUP_LAG_INTERVAL = 0.01
+
+ATTR_ALBUM_IDS = "album_ids"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_DATE_FROM = "date_from"
+ATTR_DATE_TO = "date_to"
+ATTR_DURATION = "duration"
+ATTR_ENABLED = "enabled"
+ATTR_EXCLUSIVE = "exclusive"
+ATTR_FULL = "full"
+ATTR_LIMIT = "limit"
+ATTR_MODE = "mode"
+ATTR_NAME = "name"
+ATTR_QUERY = "query"
+ATTR_TAG_IDS = "tag_ids"
+ATTR_TYPE = "type"
+ATTR_WEIGHT = "weight"
+
+SERVICE_BULK_ENABLE = "bulk_enable"
+SERVICE_DELETE_PROFILE = "delete_profile"
+SERVICE_NEXT_IMAGE = "next_image"
+SERVICE_QUERY_IMAGES = "query_images"
+SERVICE_RESTORE_PROFILE = "restore_profile"
+SERVICE_RUN_PROFILER = "run_profiler"
+SERVICE_SAVE_PROFILE = "save_profile"
+SERVICE_SEARCH = "search"
+SERVICE_SET_SELECTION = "set_selection"
+SERVICE_SET_WEIGHT = "set_weight"
+SERVICE_SYNC_INDEX = "sync_index"
+
+# Search types exposed on services mapped to the piwigo_type of a Device.
+SEARCH_TYPES = {"album": "cat", "tag": "tag"}
+
+# Modes of the run_profiler service, the first is the default.
+PROFILE_MODES = ["sampling", "cprofile"]
@@ -1,9 +1,13 @@
 """Integration 101 Template integration using DataUpdateCoordinator."""
 
-from dataclasses import dataclass
+import asyncio
+from dataclasses import dataclass, replace
 from datetime import timedelta
+import json
 import logging
-from typing import Any
+import threading
+import time
+from typing import TYPE_CHECKING, Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
@@ -12,11 +16,36 @@ from homeassistant.const import (
     CONF_SCAN_INTERVAL,
     CONF_USERNAME,
 )
-from homeassistant.core import DOMAIN, HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.importlib import async_import_module
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
 from .api import API, APIAuthError, Device, DeviceType
-from .const import DEFAULT_SCAN_INTERVAL
+from .const import (
+    CONF_BATCH_WINDOW,
+    CONF_INDEX_CONCURRENCY,
+    CONF_INDEX_PAGE_SIZE,
+    CONF_PUSH_SCAN_INTERVAL,
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_INDEX_CONCURRENCY,
+    DEFAULT_INDEX_PAGE_SIZE,
+    DEFAULT_PUSH_SCAN_INTERVAL,
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+    REFRESH_TIMEOUT,
+    SIGNAL_IMAGE_INDEX_UPDATED,
+    SNAPSHOT_SAVE_DELAY,
+    SNAPSHOT_STORAGE_KEY,
+    SNAPSHOT_STORAGE_VERSION,
+)
+from .index import DeviceIndex
+
+if TYPE_CHECKING:
+    from .image_index import ImageIndex
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,6 +56,7 @@ class PiwigoWallDisplayAPIData:
 
     controller_name: str
     devices: list[Device]
+    index: DeviceIndex
 
 
 class PiwigoWallDisplayCoordinator(DataUpdateCoordinator):
@@ -46,6 +76,19 @@ class PiwigoWallDisplayCoordinator(DataUpdateCoordinator):
         self.poll_interval = config_entry.options.get(
             CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL
         )
+        self.push_poll_interval = config_entry.options.get(
+            CONF_PUSH_SCAN_INTERVAL, DEFAULT_PUSH_SCAN_INTERVAL
+        )
+        self.index_concurrency = config_entry.options.get(
+            CONF_INDEX_CONCURRENCY, DEFAULT_INDEX_CONCURRENCY
+        )
+        self.index_page_size = config_entry.options.get(
+            CONF_INDEX_PAGE_SIZE, DEFAULT_INDEX_PAGE_SIZE
+        )
+        self.batch_window = config_entry.options.get(
+            CONF_BATCH_WINDOW, DEFAULT_BATCH_WINDOW
+        )
+        self.entry_id = config_entry.entry_id
 
         # Initialise DataUpdateCoordinator
         super().__init__(
@@ -60,7 +103,37 @@ class PiwigoWallDisplayCoordinator(DataUpdateCoordinator):
         )
 
         # Initialise your api here
-        self.api = API(host=self.host, user=self.user, pwd=self.pwd)
+        self.api = API(
+            host=self.host, user=self.user, pwd=self.pwd, timeout=REFRESH_TIMEOUT
+        )
+
+        # Timings of the platform setups, logged at debug level.
+        self.setup_stats: dict[str, dict[str, Any]] = {}
+
+        # Local image metadata, opened by async_setup_entry.
+        # Opened on the first index sync, at image_index_path.
+        self.image_index: ImageIndex | None = None
+        self.image_index_path: str | None = None
+        # Set by async_close_index, guarded by a thread lock as the index is
+        # opened in the executor.
+        self._index_closed = False
+        self._index_open_lock = threading.Lock()
+        self.index_stats: dict[str, Any] = {}
+        self._index_lock = asyncio.Lock()
+
+        # Webhook pushes, see async_handle_push.
+        self.last_push: float | None = None
+        self.push_stats: dict[str, Any] = {"received": 0}
+
+        # Switch changes waiting for the batch window, see async_set_device.
+        self._pending: dict[str, tuple[Device, Any]] = {}
+        self._cancel_flush: CALLBACK_TYPE | None = None
+
+        # The last full_table payload, so the next start does not wait on Piwigo.
+        self._snapshot_store: Store[dict[str, Any]] = Store(
+            hass, SNAPSHOT_STORAGE_VERSION, SNAPSHOT_STORAGE_KEY.format(self.entry_id)
+        )
+        self._snapshot_hash: int | None = None
 
     async def async_update_data(self):
         """Fetch data from API endpoint.
@@ -68,34 +141,277 @@ class PiwigoWallDisplayCoordinator(DataUpdateCoordinator):
         This is the place to pre-process the data to lookup tables
         so entities can quickly look up their data.
         """
+        if (
+            self.last_push is not None
+            and time.monotonic() - self.last_push > self.push_poll_interval
+        ):
+            # Pushes have stopped arriving, go back to the normal polling interval.
+            _LOGGER.debug("No webhook push received, resuming normal polling")
+            self.last_push = None
+            self.update_interval = timedelta(seconds=self.poll_interval)
         try:
             # if not self.api.connected:
             #    await self.hass.async_add_executor_job(self.api.connect)
-            devices = await self.hass.async_add_executor_job(self.api.get_devices)
+            devices, index, payload = await self.hass.async_add_executor_job(
+                self._fetch_devices
+            )
         except APIAuthError as err:
-            _LOGGER.error(err)
-            raise UpdateFailed(err) from err
+            # Marks the entities unavailable and asks for new credentials, also
+            # when they were started from a snapshot without logging in.
+            raise ConfigEntryAuthFailed(err) from err
         except Exception as err:
             # This will show entities as unavailable by raising UpdateFailed exception
             raise UpdateFailed(f"Error communicating with API: {err}") from err
 
+        if payload is not None:
+            self._save_snapshot(payload)
+
         # What is returned here is stored in self.data by the DataUpdateCoordinator
-        return PiwigoWallDisplayAPIData(self.api.controller_name, devices)
+        return PiwigoWallDisplayAPIData(self.api.controller_name, devices, index)
+
+    def _fetch_devices(
+        self,
+    ) -> tuple[list[Device], DeviceIndex, dict[str, Any] | None]:
+        """Get devices and build their search index, run in the executor.
+
+        The full_table payload is returned too when it differs from the last
+        one, to be stored as the snapshot.
+        """
+        raw = self.api.get_full_table()
+        payload = json.loads(raw)
+        devices = self.api.parse_full_table(payload)
+        changed = hash(raw) != self._snapshot_hash
+        self._snapshot_hash = hash(raw)
+        return devices, DeviceIndex(devices), payload if changed else None
+
+    def _save_snapshot(self, payload: dict[str, Any]) -> None:
+        """Store a full_table payload for the next start, batching writes."""
+        self._snapshot_store.async_delay_save(lambda: payload, SNAPSHOT_SAVE_DELAY)
+
+    async def async_load_snapshot(self) -> bool:
+        """Set the data from the stored full_table payload of the last run.
+
+        Returns False when there is no usable snapshot.  The data is as old as
+        the snapshot and nothing has logged in yet, refresh to bring it up to
+        date and check the credentials.
+        """
+        payload = await self._snapshot_store.async_load()
+        if payload is None:
+            return False
+        try:
+            devices, index = await self.hass.async_add_executor_job(
+                self._parse_devices, payload
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.debug("Ignoring unreadable snapshot: %s", err)
+            return False
+        self.async_set_updated_data(
+            PiwigoWallDisplayAPIData(self.api.controller_name, devices, index)
+        )
+        return True
+
+    def _parse_devices(
+        self, payload: dict[str, Any]
+    ) -> tuple[list[Device], DeviceIndex]:
+        """Parse a pushed full_table payload, run in the executor."""
+        devices = self.api.parse_full_table(payload)
+        return devices, DeviceIndex(devices)
+
+    async def async_handle_push(self, payload: dict[str, Any]) -> None:
+        """Apply a change notification received on the webhook.
+
+        The payload is either a full_table payload ("cats", "tags" and "mode")
+        or a list of changes:
+
+            {"albums": [{"id": 12, "enabled": true}, 40], "tags": [], "mode": "cat"}
+
+        Changes carrying "enabled" are applied to the current data directly.
+        Bare ids, and ids not yet known, are fetched with a refresh.
+        """
+        received = time.monotonic()
+        self.last_push = received
+        self.update_interval = timedelta(seconds=self.push_poll_interval)
+
+        if "cats" in payload and "tags" in payload:
+            devices, index = await self.hass.async_add_executor_job(
+                self._parse_devices, payload
+            )
+            self.async_set_updated_data(
+                PiwigoWallDisplayAPIData(self.api.controller_name, devices, index)
+            )
+            self._save_snapshot(payload)
+        elif self.data is not None:
+            changed, needs_refresh = self._pushed_changes(payload)
+            if changed:
+                self.data.index.replace_devices(changed)
+                self.async_set_updated_data(self.data)
+            if needs_refresh:
+                await self.async_request_refresh()
+
+        self.push_stats["received"] += 1
+        self.push_stats["last_apply_ms"] = round(
+            (time.monotonic() - received) * 1000, 2
+        )
+        if isinstance(sent_at := payload.get("sent_at"), (int, float)):
+            # Sender clock, only meaningful when it is in sync with ours.
+            self.push_stats["last_latency_ms"] = round(
+                (time.time() - sent_at) * 1000, 2
+            )
+        _LOGGER.debug("Webhook push applied: %s", self.push_stats)
+
+    def _pushed_changes(self, payload: dict[str, Any]) -> tuple[list[Device], bool]:
+        """Return updated devices for a pushed change list and if a refresh is due."""
+        index = self.data.index
+        changed: list[Device] = []
+        needs_refresh = False
+        for key, piwigo_type in (("albums", "cat"), ("tags", "tag")):
+            for item in payload.get(key, []):
+                if not isinstance(item, dict) or "enabled" not in item:
+                    needs_refresh = True
+                    continue
+                device = index.by_piwigo_id(piwigo_type, int(item["id"]))
+                if device is None:
+                    needs_refresh = True
+                    continue
+                state = item["enabled"] not in (False, 0, "0", "false")
+                if bool(device.state) != state:
+                    changed.append(replace(device, state=state))
+        mode = payload.get("mode")
+        if mode is not None and (device := index.by_piwigo_id("mode", 0)) is not None:
+            if device.state != mode:
+                changed.append(replace(device, state=mode))
+        return changed, needs_refresh
+
+    async def async_sync_index(self, full: bool = False) -> dict[str, Any]:
+        """Crawl new images into the local image index.
+
+        The index module is imported and the index opened on the first sync.
+        Listeners of SIGNAL_IMAGE_INDEX_UPDATED are told once it is done.
+        Nothing is synced once the index has been closed for an unload.
+        """
+        tag_ids = [
+            int(device.piwigo_id)
+            for device in self.data.devices
+            if device.piwigo_type == "tag"
+        ]
+        async with self._index_lock:
+            image_index = self.image_index
+            if image_index is None and not self._index_closed:
+                module = await async_import_module(
+                    self.hass, f"{__package__}.image_index"
+                )
+                image_index = await self.hass.async_add_executor_job(
+                    self._open_index, module
+                )
+            if image_index is None:
+                # The entry has unloaded.
+                return self.index_stats
+            self.index_stats = await self.hass.async_add_executor_job(
+                image_index.sync,
+                self.api,
+                tag_ids,
+                self.index_page_size,
+                self.index_concurrency,
+                full,
+            )
+        async_dispatcher_send(
+            self.hass, SIGNAL_IMAGE_INDEX_UPDATED.format(self.entry_id)
+        )
+        return self.index_stats
+
+    def _open_index(self, module) -> "ImageIndex | None":
+        """Open the image index, run in the executor.
+
+        Returns None and closes it again when the entry unloaded meanwhile.
+        The unload may have cancelled the awaiting sync, so this is checked
+        here rather than after the await.
+        """
+        image_index = module.ImageIndex(self.image_index_path)
+        with self._index_open_lock:
+            if not self._index_closed:
+                self.image_index = image_index
+                return image_index
+        image_index.close()
+        return None
+
+    async def async_close_index(self) -> None:
+        """Close the image index on unload, also if a sync is still opening it.
+
+        A sync in progress is not waited for, its write fails on the closed
+        database and is logged.
+        """
+        with self._index_open_lock:
+            self._index_closed = True
+            image_index, self.image_index = self.image_index, None
+        if image_index is not None:
+            await self.hass.async_add_executor_job(image_index.close)
+
+    async def async_apply_changes(self, changes: list[tuple[Device, Any]]) -> int:
+        """Send several set_data calls as one batched write and refresh once.
+
+        Returns the number of changes sent.
+        """
+        if changes:
+            await self.hass.async_add_executor_job(self.api.set_many, changes)
+            await self.async_refresh()
+        return len(changes)
+
+    async def async_set_device(self, device: Device, value: Any) -> None:
+        """Write one switch change, batching it with others in the batch window.
+
+        Without a batch window the change is written and refreshed straight
+        away.  Otherwise it shows right away and is sent with every other
+        change made within the window, followed by a single refresh.
+        """
+        if not self.batch_window:
+            await self.async_apply_changes([(device, value)])
+            return
+        self._pending[device.device_unique_id] = (device, value)
+        self.data.index.replace_devices([replace(device, state=value == "true")])
+        self.async_set_updated_data(self.data)
+        if self._cancel_flush is None:
+            self._cancel_flush = async_call_later(
+                self.hass, self.batch_window, self._async_flush
+            )
+
+    async def _async_flush(self, *_) -> None:
+        """Send the switch changes collected during the batch window."""
+        self._cancel_flush = None
+        changes = list(self._pending.values())
+        self._pending.clear()
+        _LOGGER.debug("Sending %s batched changes", len(changes))
+        await self.async_apply_changes(changes)
+
+    async def async_shutdown(self) -> None:
+        """Send batched changes that are still waiting before shutting down."""
+        if self._cancel_flush is not None:
+            self._cancel_flush()
+            await self._async_flush()
+        await super().async_shutdown()
+
+    async def async_set_enabled(self, devices: list[Device], enabled: bool) -> int:
+        """Enable or disable several devices with one batched write.
+
+        Devices already in the requested state are skipped.  Returns the
+        number of devices changed.
+        """
+        return await self.async_apply_changes(
+            [
+                (device, "true" if enabled else "false")
+                for device in devices
+                if bool(device.state) != enabled
+            ]
+        )
 
     def get_device_by_id(
         self, device_type: DeviceType, device_id: int
     ) -> Device | None:
         """Return device by device id."""
         # Called by the binary sensors and sensors to get their updated data from self.data
-        try:
-            return [
-                device
-                for device in self.data.devices
-                if device.device_type == device_type
-                and device.device_unique_id == device_id
-            ][0]
-        except IndexError:
+        device = self.data.index.by_unique_id.get(device_id)
+        if device is None or device.device_type != device_type:
             return None
+        return device
 
     def get_device(self, device_id: int) -> dict[str, Any]:
         """Get a device entity from our api data."""
@@ -0,0 +1,137 @@
+"""Selection coverage.
+
+Counts how many distinct images the wall rotates through.  The images of each
+album and tag are held roaring bitmap style: image ids are split into chunks
+of 65536 by their high bits, sparse chunks store their low 16 bits in a sorted
+array and dense chunks a 65536 bit bitmap.  Unions are kept as one bitmap per
+chunk.  Sets are only built for albums and tags that are enabled, loaded from
+the image index on demand.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from typing import Any
+
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+# Chunks with at least this many images are held as bitmaps, which are then
+# no bigger than the array would be.
+DENSE_THRESHOLD = 4096
+
+
+def _bitmap(offsets: Iterable[int]) -> int:
+    """Return the bitmap of the low bits of image ids in one chunk."""
+    bits = bytearray((1 << CHUNK_BITS) // 8)
+    for offset in offsets:
+        bits[offset >> 3] |= 1 << (offset & 7)
+    return int.from_bytes(bits, "little")
+
+
+class ImageIdSet:
+    """Compact set of image ids split into 65536 id chunks."""
+
+    __slots__ = ("chunks",)
+
+    def __init__(self, image_ids: Iterable[int]) -> None:
+        """Build the chunks from image ids."""
+        image_ids = sorted(image_ids)
+        self.chunks: dict[int, array | int] = {}
+        start = 0
+        while start < len(image_ids):
+            key = image_ids[start] >> CHUNK_BITS
+            end = bisect_left(image_ids, (key + 1) << CHUNK_BITS, start)
+            low = array("H", map(CHUNK_MASK.__and__, image_ids[start:end]))
+            self.chunks[key] = _bitmap(low) if len(low) >= DENSE_THRESHOLD else low
+            start = end
+
+
+def _union_into(union: dict[int, int], id_sets: Iterable[ImageIdSet]) -> None:
+    """OR image id sets into a union of per chunk bitmaps."""
+    sparse: dict[int, list[array]] = {}
+    for id_set in id_sets:
+        for key, container in id_set.chunks.items():
+            if isinstance(container, int):
+                union[key] = union.get(key, 0) | container
+            else:
+                sparse.setdefault(key, []).append(container)
+    for key, arrays in sparse.items():
+        # Merging the arrays first sets each bit once however many sources
+        # share an image.
+        offsets = arrays[0] if len(arrays) == 1 else set().union(*arrays)
+        union[key] = union.get(key, 0) | _bitmap(offsets)
+
+
+class CoverageEngine:
+    """Image id sets of enabled albums and tags, combined for the selection.
+
+    loader returns the image ids of albums ("cat") or tags ("tag") by id.
+    Enabling albums or tags ORs their sets into the running union, disabling
+    recomputes the union from the remaining ones.
+    """
+
+    def __init__(
+        self, loader: Callable[[str, list[int]], dict[int, list[int]]]
+    ) -> None:
+        """Initialise, sets are loaded on first use."""
+        self._loader = loader
+        self._sets: dict[str, dict[int, ImageIdSet]] = {"cat": {}, "tag": {}}
+        self._enabled: dict[str, set[int]] = {"cat": set(), "tag": set()}
+        self._unions: dict[str, dict[int, int]] = {"cat": {}, "tag": {}}
+
+    def clear(self) -> None:
+        """Forget every set, call when the image index has been synced."""
+        for piwigo_type in self._sets:
+            self._sets[piwigo_type] = {}
+            self._enabled[piwigo_type] = set()
+            self._unions[piwigo_type] = {}
+
+    def _id_sets(self, piwigo_type: str, ids: Iterable[int]) -> list[ImageIdSet]:
+        """Return the sets of albums or tags, loading missing ones."""
+        ids = list(ids)
+        cached = self._sets[piwigo_type]
+        if missing := [i for i in ids if i not in cached]:
+            loaded = self._loader(piwigo_type, missing)
+            for source_id in missing:
+                cached[source_id] = ImageIdSet(loaded.get(source_id, []))
+        return [cached[i] for i in ids]
+
+    def _update(self, piwigo_type: str, enabled: set[int]) -> dict[int, int]:
+        """Bring the union of one type up to date with an enabled set."""
+        previous = self._enabled[piwigo_type]
+        if previous - enabled:
+            union: dict[int, int] = {}
+            _union_into(union, self._id_sets(piwigo_type, enabled))
+        else:
+            union = self._unions[piwigo_type]
+            _union_into(union, self._id_sets(piwigo_type, enabled - previous))
+        self._enabled[piwigo_type] = set(enabled)
+        self._unions[piwigo_type] = union
+        return union
+
+    def compute(
+        self, album_ids: set[int], tag_ids: set[int], mode: str
+    ) -> dict[str, Any]:
+        """Return image counts of the enabled albums and tags.
+
+        album_ids should include sub-albums.  The mode select decides which
+        of the two sets the wall actually shows.
+        """
+        albums = self._update("cat", album_ids)
+        tags = self._update("tag", tag_ids)
+        album_count = sum(bits.bit_count() for bits in albums.values())
+        tag_count = sum(bits.bit_count() for bits in tags.values())
+        overlap = sum(
+            (albums[key] & tags[key]).bit_count()
+            for key in albums.keys() & tags.keys()
+        )
+        return {
+            "images": album_count if mode == "cat" else tag_count,
+            "album_images": album_count,
+            "tag_images": tag_count,
+            "overlap_images": overlap,
+            "union_images": album_count + tag_count - overlap,
+        }
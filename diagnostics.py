@@ -0,0 +1,43 @@
+"""Diagnostics support for our Integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME, CONF_WEBHOOK_ID
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_PROBE, DATA_WATCHDOG, DOMAIN
+
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME, CONF_WEBHOOK_ID}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the connection probe and runtime statistics of a config entry."""
+    diagnostics: dict[str, Any] = {
+        "data": async_redact_data(dict(config_entry.data), TO_REDACT),
+        "options": {
+            key: value
+            for key, value in config_entry.options.items()
+            if key != CONF_PROBE
+        },
+        "probe": config_entry.options.get(CONF_PROBE),
+    }
+    if (runtime_data := hass.data.get(DOMAIN, {}).get(config_entry.entry_id)) is None:
+        return diagnostics
+    coordinator = runtime_data.coordinator
+    watchdog = hass.data.get(DATA_WATCHDOG)
+    diagnostics.update(
+        {
+            "devices": len(coordinator.data.devices) if coordinator.data else None,
+            "setup_stats": coordinator.setup_stats,
+            "push_stats": coordinator.push_stats,
+            "index_stats": coordinator.index_stats,
+            "loop_stalls": watchdog.stats() if watchdog is not None else None,
+        }
+    )
+    return diagnostics
@@ -0,0 +1,227 @@
+"""Image setup for our Integration."""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import multiprocessing
+import site
+
+from homeassistant.components.image import ImageEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    CONF_DISPLAY_HEIGHT,
+    CONF_DISPLAY_WIDTH,
+    CONF_IMAGE_CACHE_SIZE,
+    DEFAULT_DISPLAY_HEIGHT,
+    DEFAULT_DISPLAY_WIDTH,
+    DEFAULT_IMAGE_CACHE_SIZE,
+    DOMAIN,
+    IMAGE_PREFETCH_COUNT,
+    RESIZE_WORKERS,
+)
+from .coordinator import PiwigoWallDisplayCoordinator
+from .image_cache import (
+    RESIZE_WORKER_DIR,
+    DiskLRUCache,
+    image_content_type,
+    load_resize_worker,
+)
+from .sampler import ImageEngine
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+):
+    """Set up the wall Image."""
+    runtime_data = hass.data[DOMAIN][config_entry.entry_id]
+    options = config_entry.options
+    cache = await hass.async_add_executor_job(
+        DiskLRUCache,
+        hass.config.path(DOMAIN, config_entry.entry_id),
+        options.get(CONF_IMAGE_CACHE_SIZE, DEFAULT_IMAGE_CACHE_SIZE) * 1024 * 1024,
+    )
+    async_add_entities(
+        [
+            PiwigoWallDisplayImage(
+                hass,
+                runtime_data.coordinator,
+                runtime_data.images,
+                cache,
+                options.get(CONF_DISPLAY_WIDTH, DEFAULT_DISPLAY_WIDTH),
+                options.get(CONF_DISPLAY_HEIGHT, DEFAULT_DISPLAY_HEIGHT),
+            )
+        ]
+    )
+
+
+class PiwigoWallDisplayImage(ImageEntity):
+    """The current wall image, advanced by the next_image service.
+
+    Images are fetched as the smallest Piwigo derivative that fills the display,
+    downscaled in a process pool and kept in an on-disk LRU cache.  The next
+    images of the sampler's prefetch queue are cached ahead of time.
+    """
+
+    _attr_has_entity_name = True
+    _attr_content_type = "image/jpeg"
+    _unrecorded_attributes = frozenset(
+        {
+            "cache_hits",
+            "cache_misses",
+            "cache_hit_rate",
+            "cache_bytes_saved",
+            "cache_size_bytes",
+            "cache_files",
+            "bytes_downloaded",
+        }
+    )
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: PiwigoWallDisplayCoordinator,
+        images: ImageEngine,
+        cache: DiskLRUCache,
+        width: int,
+        height: int,
+    ) -> None:
+        """Initialise entity."""
+        super().__init__(hass)
+        self.coordinator = coordinator
+        self.images = images
+        self.cache = cache
+        self.width = width
+        self.height = height
+        self.bytes_downloaded = 0
+        self._pool: ProcessPoolExecutor | None = None
+        self._fetching: dict[str, asyncio.Task[bytes]] = {}
+
+        controller_name = coordinator.data.controller_name
+        self._attr_name = "Piwigo_wall_image"
+        self._attr_unique_id = f"{DOMAIN}-{controller_name}_wall_image"
+        self._attr_device_info = DeviceInfo(
+            name="Wall Display Options1",
+            manufacturer="ACME Manufacturer",
+            model="piwigo",
+            sw_version="1.0",
+            identifiers={(DOMAIN, f"{controller_name}-1")},
+        )
+        self._update_attributes()
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the image sampler."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.images.async_add_listener(self._handle_image_change)
+        )
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel fetches in flight and stop the resize workers."""
+        for task in self._fetching.values():
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @callback
+    def _handle_image_change(self) -> None:
+        """Show the new current image and cache the ones after it."""
+        self._attr_image_last_updated = dt_util.utcnow()
+        self._update_attributes()
+        self.async_write_ha_state()
+        self.platform.config_entry.async_create_background_task(
+            self.hass, self._async_prefetch(), f"{DOMAIN} wall image prefetch"
+        )
+
+    def _update_attributes(self) -> None:
+        """Set the current image id and cache statistics."""
+        self._attr_extra_state_attributes = {
+            "image_id": self.images.current,
+            **self.cache.stats(),
+            "bytes_downloaded": self.bytes_downloaded,
+        }
+
+    def _key(self, image_id: int) -> str:
+        """Return the cache file name of an image at the display size."""
+        return f"{image_id}_{self.width}x{self.height}.jpg"
+
+    async def async_image(self) -> bytes | None:
+        """Return bytes of the current image."""
+        if self.images.current is None:
+            return None
+        key = self._key(self.images.current)
+        if key in self._fetching:
+            data = await self._fetching[key]
+            self._attr_content_type = image_content_type(data)
+            return data
+        data = await self.hass.async_add_executor_job(self.cache.get, key)
+        if data is None:
+            data = await self._async_fetch(self.images.current)
+        # Images already small enough are cached as downloaded, not as JPEG.
+        self._attr_content_type = image_content_type(data)
+        self._update_attributes()
+        return data
+
+    def _async_fetch(self, image_id: int) -> asyncio.Task[bytes]:
+        """Download, resize and cache an image, sharing an in flight fetch."""
+        key = self._key(image_id)
+        if key not in self._fetching:
+            # Tied to the config entry, so unloading it cancels the fetch.
+            self._fetching[key] = (
+                self.platform.config_entry.async_create_background_task(
+                    self.hass,
+                    self._async_download(image_id, key),
+                    f"{DOMAIN} wall image fetch",
+                )
+            )
+        return self._fetching[key]
+
+    async def _async_download(self, image_id: int, key: str) -> bytes:
+        """Fetch an image into the cache."""
+        try:
+            raw = await self.hass.async_add_executor_job(
+                self.coordinator.api.get_image_derivative,
+                image_id,
+                self.width,
+                self.height,
+            )
+            self.bytes_downloaded += len(raw)
+            worker = await self.hass.async_add_executor_job(load_resize_worker)
+            if self._pool is None:
+                # Spawned workers keep Pillow decoding off the event loop's GIL.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=RESIZE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=site.addsitedir,
+                    initargs=(RESIZE_WORKER_DIR,),
+                )
+            data = await self.hass.loop.run_in_executor(
+                self._pool, worker.resize_image, raw, self.width, self.height
+            )
+            await self.hass.async_add_executor_job(
+                self.cache.put, key, data, len(raw)
+            )
+            return data
+        finally:
+            self._fetching.pop(key, None)
+
+    async def _async_prefetch(self) -> None:
+        """Cache the next images of the sampler's queue."""
+        for image_id in list(self.images.sampler.queue)[:IMAGE_PREFETCH_COUNT]:
+            if self._key(image_id) in self.cache:
+                continue
+            try:
+                await self._async_fetch(image_id)
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.debug("Error prefetching image %s: %s", image_id, err)
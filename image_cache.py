@@ -0,0 +1,157 @@
+"""Size bounded on-disk LRU cache of wall images.
+
+Images are stored already downscaled to the display resolution, so a cache hit
+needs neither a download nor a decode.  Each file name ends in the size of the
+download it was made from, which a hit counts as saved.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import importlib.util
+import logging
+import os
+from pathlib import Path
+import sys
+import threading
+from types import ModuleType
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# The resize worker is imported as a top level module from its own directory,
+# which spawned pool workers add to their path.  Unpickling resize_image there
+# then imports neither the integration nor Home Assistant.  Workers still
+# import Home Assistant's __main__ module, as every spawned process re-imports
+# the main module, but not the rest of Home Assistant.
+RESIZE_WORKER_DIR = str(Path(__file__).parent / "resize_worker")
+RESIZE_WORKER_MODULE = "piwigo_wall_resize"
+
+
+def image_content_type(data: bytes) -> str:
+    """Return the MIME type of JPEG, PNG, GIF or WebP image data."""
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"GIF8"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def load_resize_worker() -> ModuleType:
+    """Return the resize worker module, importing it once, run in the executor."""
+    if (module := sys.modules.get(RESIZE_WORKER_MODULE)) is None:
+        spec = importlib.util.spec_from_file_location(
+            RESIZE_WORKER_MODULE,
+            Path(RESIZE_WORKER_DIR) / f"{RESIZE_WORKER_MODULE}.py",
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[RESIZE_WORKER_MODULE] = module
+    return module
+
+
+def _split_file_name(name: str) -> tuple[str, int | None]:
+    """Return the key and download size of a cache file name."""
+    key, _, source_bytes = name.rpartition(".")
+    if not key or not source_bytes.isdigit():
+        return name, None
+    return key, int(source_bytes)
+
+
+class DiskLRUCache:
+    """Files in a directory, evicting the least recently used over max_bytes.
+
+    Methods do blocking file IO, call them from the executor.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        """Initialise, picking up files cached by a previous run."""
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Download bytes that cache hits did not have to fetch again.
+        self.bytes_saved = 0
+        self.size = 0
+        self._lock = threading.Lock()
+        # Key to file size and the size of the download it was made from.
+        self._entries: OrderedDict[str, tuple[int, int]] = OrderedDict()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in sorted(self.directory.iterdir(), key=lambda p: p.stat().st_mtime):
+            key, source_bytes = _split_file_name(path.name)
+            if source_bytes is None:
+                # Written before download sizes were kept.
+                path.unlink(missing_ok=True)
+                continue
+            self._entries[key] = (path.stat().st_size, source_bytes)
+            self.size += self._entries[key][0]
+        self._evict()
+
+    def _path(self, key: str) -> Path:
+        """Return the path of a cached file."""
+        return self.directory / f"{key}.{self._entries[key][1]}"
+
+    def get(self, key: str) -> bytes | None:
+        """Return a cached file and mark it recently used."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry = self._entries[key]
+            path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                if self._entries.get(key) == entry:
+                    self.size -= self._entries.pop(key)[0]
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += entry[1]
+        # Keep recency across restarts.
+        os.utime(path)
+        return data
+
+    def __contains__(self, key: str) -> bool:
+        """Return if a key is cached, without counting a hit or miss."""
+        return key in self._entries
+
+    def put(self, key: str, data: bytes, source_bytes: int) -> None:
+        """Store a file made from a download of source_bytes.
+
+        Old files are evicted to stay under max_bytes.
+        """
+        path = self.directory / f"{key}.{source_bytes}"
+        path.write_bytes(data)
+        with self._lock:
+            if key in self._entries:
+                if self._path(key) != path:
+                    self._path(key).unlink(missing_ok=True)
+                self.size -= self._entries.pop(key)[0]
+            self._entries[key] = (len(data), source_bytes)
+            self.size += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used files until under max_bytes."""
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            key, (size, source_bytes) = self._entries.popitem(last=False)
+            self.size -= size
+            (self.directory / f"{key}.{source_bytes}").unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit rate and size figures."""
+        lookups = self.hits + self.misses
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "cache_bytes_saved": self.bytes_saved,
+            "cache_size_bytes": self.size,
+            "cache_files": len(self._entries),
+        }
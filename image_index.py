@@ -0,0 +1,334 @@
+"""Local SQLite index of Piwigo image metadata.
+
+Image ids, album memberships, tags, dates and sizes are mirrored with paged,
+concurrent ws.php calls so image level queries run locally.  After the first
+crawl only images made available since the last sync are fetched; a full
+crawl also picks up deletions and changed memberships.  Piwigo keeps no date
+of tag changes, so tags are only crawled by full syncs and are as old as the
+last one.
+
+All methods block, call them from the executor.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import logging
+import math
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .api import API
+
+_LOGGER = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    date_creation TEXT,
+    date_available TEXT,
+    width INTEGER,
+    height INTEGER,
+    filesize INTEGER
+);
+CREATE INDEX IF NOT EXISTS images_date_creation ON images (date_creation);
+CREATE TABLE IF NOT EXISTS image_albums (
+    album_id INTEGER NOT NULL,
+    image_id INTEGER NOT NULL,
+    PRIMARY KEY (album_id, image_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS image_albums_image ON image_albums (image_id);
+CREATE TABLE IF NOT EXISTS image_tags (
+    tag_id INTEGER NOT NULL,
+    image_id INTEGER NOT NULL,
+    PRIMARY KEY (tag_id, image_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Piwigo's date format, which also sorts correctly as text.
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Incremental syncs look back this far to cover clock and time zone differences
+# with the server.
+SYNC_OVERLAP = timedelta(days=1)
+
+# Incremental syncs miss deletions and moved images, crawl fully this often.
+FULL_SYNC_INTERVAL = timedelta(days=7)
+
+
+def _ids_clause(column: str, ids: list[int]) -> str:
+    """Return an IN clause for a list of integer ids."""
+    return f"{column} IN ({','.join(str(int(i)) for i in ids)})"
+
+
+class ImageIndex:
+    """SQLite mirror of the images visible to the Piwigo user."""
+
+    def __init__(self, path: str) -> None:
+        """Open or create the index database."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self.last_sync = self._get_meta("last_sync")
+        self.last_full_sync = self._get_meta("last_full_sync")
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    @property
+    def synced(self) -> bool:
+        """Return if at least one crawl has completed."""
+        return self.last_sync is not None
+
+    def _get_meta(self, key: str) -> str | None:
+        """Return a value from the meta table."""
+        row = self._db.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def sync(
+        self,
+        api: API,
+        tag_ids: Iterable[int],
+        page_size: int,
+        concurrency: int,
+        full: bool = False,
+    ) -> dict[str, Any]:
+        """Crawl Piwigo into the index and return crawl statistics.
+
+        Incremental syncs fetch images made available since the last sync.
+        Full syncs also crawl every tag, one listing per tag as
+        pwg.categories.getImages does not list them.  Every worker thread
+        gets its own clone of api, as requests sessions are not thread safe.
+        """
+        start = time.monotonic()
+        # A crawl as guest would drop every private image from the index.
+        api.ensure_logged_in()
+        now = datetime.now()
+        started_at = now.strftime(DATE_FORMAT)
+        full = (
+            full
+            or self.last_full_sync is None
+            or now - datetime.strptime(self.last_full_sync, DATE_FORMAT)
+            > FULL_SYNC_INTERVAL
+        )
+        since: dict[str, Any] = {}
+        if not full:
+            since["f_min_date_available"] = (
+                datetime.strptime(self.last_sync, DATE_FORMAT) - SYNC_OVERLAP
+            ).strftime(DATE_FORMAT)
+
+        local = threading.local()
+        clones: list[API] = []
+
+        def worker_api() -> API:
+            """Return the API clone of the calling worker thread."""
+            if not hasattr(local, "api"):
+                local.api = api.clone()
+                clones.append(local.api)
+            return local.api
+
+        tagged: dict[int, list[dict[str, Any]]] = {}
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                images = self._crawl(
+                    api,
+                    "pwg.categories.getImages",
+                    {"recursive": "true", **since},
+                    page_size,
+                    executor,
+                    worker_api,
+                )
+                if full:
+                    # Tags are usually small, crawl them in parallel instead of
+                    # their pages.
+                    tag_ids = list(tag_ids)
+                    tagged = dict(
+                        zip(
+                            tag_ids,
+                            executor.map(
+                                lambda tag_id: self._crawl(
+                                    worker_api(),
+                                    "pwg.tags.getImages",
+                                    {"tag_id": tag_id},
+                                    page_size,
+                                ),
+                                tag_ids,
+                            ),
+                        )
+                    )
+        finally:
+            for clone in clones:
+                clone.session.close()
+
+        with self._lock, self._db:
+            if full:
+                self._db.execute("DELETE FROM images")
+                self._db.execute("DELETE FROM image_albums")
+                self._db.execute("DELETE FROM image_tags")
+            else:
+                # Refetched images get their album memberships replaced below.
+                self._db.executemany(
+                    "DELETE FROM image_albums WHERE image_id = ?",
+                    ((int(image["id"]),) for image in images),
+                )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        int(image["id"]),
+                        image.get("date_creation"),
+                        image.get("date_available"),
+                        image.get("width"),
+                        image.get("height"),
+                        image.get("filesize"),
+                    )
+                    for image in images
+                ),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO image_albums VALUES (?, ?)",
+                (
+                    (int(category["id"]), int(image["id"]))
+                    for image in images
+                    for category in image.get("categories", [])
+                ),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO image_tags VALUES (?, ?)",
+                (
+                    (tag_id, int(image["id"]))
+                    for tag_id, tag_images in tagged.items()
+                    for image in tag_images
+                ),
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('last_sync', ?)", (started_at,)
+            )
+            if full:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('last_full_sync', ?)",
+                    (started_at,),
+                )
+        self.last_sync = started_at
+        if full:
+            self.last_full_sync = started_at
+
+        stats = {
+            "full": full,
+            "images": len(images),
+            "tagged_images": sum(len(t) for t in tagged.values()),
+            "seconds": round(time.monotonic() - start, 2),
+        }
+        _LOGGER.debug("Image index sync: %s", stats)
+        return stats
+
+    def _crawl(
+        self,
+        api: API,
+        method: str,
+        params: dict[str, Any],
+        page_size: int,
+        executor: ThreadPoolExecutor | None = None,
+        worker_api: Callable[[], API] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Fetch every page of an image listing.
+
+        With an executor, pages after the first are fetched in parallel with
+        the API worker_api returns for each worker thread.
+        """
+        images, total = api.get_images_page(method, params, 0, page_size)
+        if executor is None or worker_api is None or total is None:
+            page = 1
+            while len(images) == page_size * page:
+                more, _ = api.get_images_page(method, params, page, page_size)
+                images.extend(more)
+                page += 1
+            return images
+        pages = range(1, math.ceil(total / page_size))
+        for more, _ in executor.map(
+            lambda page: worker_api().get_images_page(
+                method, params, page, page_size
+            ),
+            pages,
+        ):
+            images.extend(more)
+        return images
+
+    def query(
+        self,
+        album_ids: list[int] | None = None,
+        tag_ids: list[int] | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+        limit: int | None = None,
+    ) -> tuple[int, list[int]]:
+        """Return the count and ids of images in any of the albums or tags.
+
+        album_ids should already include sub-albums.  None means no filter on
+        albums or tags, an empty list matches nothing.  Dates filter the
+        creation date, date_to is exclusive.
+        """
+        sources = []
+        if album_ids is not None:
+            sources.append(
+                "SELECT image_id FROM image_albums WHERE "
+                + _ids_clause("album_id", album_ids)
+            )
+        if tag_ids is not None:
+            sources.append(
+                "SELECT image_id FROM image_tags WHERE "
+                + _ids_clause("tag_id", tag_ids)
+            )
+        where = []
+        params: list[Any] = []
+        if sources:
+            where.append(f"id IN ({' UNION '.join(sources)})")
+        if date_from is not None:
+            where.append("date_creation >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            where.append("date_creation < ?")
+            params.append(date_to)
+        sql = "SELECT id FROM images"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self._lock:
+            ids = [row[0] for row in self._db.execute(sql + " ORDER BY id", params)]
+        return len(ids), ids if limit is None else ids[:limit]
+
+    def memberships(
+        self, table: str, ids: list[int] | None = None
+    ) -> dict[int, list[int]]:
+        """Return the image ids of albums ("albums") or tags ("tags").
+
+        Every album or tag is returned unless ids limits them.
+        """
+        column = {"albums": "album_id", "tags": "tag_id"}[table]
+        sql = f"SELECT {column}, image_id FROM image_{table}"
+        if ids is not None:
+            sql += " WHERE " + _ids_clause(column, ids)
+        result: dict[int, list[int]] = {}
+        with self._lock:
+            for source_id, image_id in self._db.execute(sql):
+                result.setdefault(source_id, []).append(image_id)
+        return result
+
+    def album_image_ids(self, album_ids: list[int]) -> list[int]:
+        """Return the ids of images directly in any of the albums."""
+        return self.query(album_ids=album_ids)[1]
+
+    def tag_image_ids(self, tag_id: int) -> list[int]:
+        """Return the ids of images with a tag."""
+        return self.query(tag_ids=[tag_id])[1]
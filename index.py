@@ -0,0 +1,148 @@
+"""Search index.
+
+Inverted token index over the album and tag devices returned by the API, built
+once per coordinator refresh so name searches do not have to scan every device.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Iterable
+from fnmatch import fnmatchcase
+import re
+
+from .api import Device, DeviceType
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split a name or query into lower case word tokens."""
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def device_path(device: Device) -> str:
+    """Return the searchable name of a device without the Piwigo_ prefix."""
+    for prefix in ("Piwigo_album_", "Piwigo_tag_"):
+        if device.name.startswith(prefix):
+            return device.name[len(prefix) :]
+    return device.name
+
+
+class DeviceIndex:
+    """Token and prefix index over album and tag devices."""
+
+    def __init__(self, devices: list[Device]) -> None:
+        """Build the index from a device snapshot."""
+        self.devices = devices
+        self.by_unique_id: dict[str, Device] = {}
+        self._positions: dict[str, int] = {}
+        self._by_piwigo_id: dict[tuple[str, int], int] = {}
+        # Album tree by Piwigo id.  flattenAlbums lists parents before children.
+        self.album_depth: dict[int, int] = {}
+        self.album_children: dict[int, list[int]] = {}
+        # Postings hold positions in self.devices so results sort by catalog order.
+        self._postings: dict[str, set[int]] = {}
+        for position, device in enumerate(devices):
+            self.by_unique_id[device.device_unique_id] = device
+            self._positions[device.device_unique_id] = position
+            self._by_piwigo_id[(device.piwigo_type, int(device.piwigo_id))] = position
+            if device.device_type != DeviceType.SOCKET:
+                continue
+            if device.piwigo_type == "cat":
+                album_id = int(device.piwigo_id)
+                parent_id = int(device.piwigo_parent_id)
+                self.album_depth[album_id] = self.album_depth.get(parent_id, 0) + 1
+                self.album_children.setdefault(parent_id, []).append(album_id)
+            for token in set(
+                tokenize(device_path(device)) + tokenize(device.simple_name)
+            ):
+                self._postings.setdefault(token, set()).add(position)
+        self._tokens = sorted(self._postings)
+
+    def by_piwigo_id(self, piwigo_type: str, piwigo_id: int) -> Device | None:
+        """Return the device of an album ("cat"), tag, or the mode (id 0)."""
+        position = self._by_piwigo_id.get((piwigo_type, piwigo_id))
+        return None if position is None else self.devices[position]
+
+    def replace_devices(self, devices: list[Device]) -> None:
+        """Swap in updated copies of devices already in the index.
+
+        Only the state may differ, names and the album tree are not re-indexed.
+        """
+        for device in devices:
+            self.devices[self._positions[device.device_unique_id]] = device
+            self.by_unique_id[device.device_unique_id] = device
+
+    def _prefix_matches(self, prefix: str) -> set[int]:
+        """Return the positions of all devices with a token starting with prefix."""
+        start = bisect_left(self._tokens, prefix)
+        end = start
+        while end < len(self._tokens) and self._tokens[end].startswith(prefix):
+            end += 1
+        if end - start == 1:
+            # Single token, return its postings without copying them.
+            return self._postings[self._tokens[start]]
+        return set().union(*(self._postings[t] for t in self._tokens[start:end]))
+
+    def search(self, query: str, piwigo_type: str | None = None) -> list[Device]:
+        """Return devices matching every token of query, in catalog order.
+
+        Each query token matches as a prefix, so "2019 / vac" finds
+        "2019 / Vacation" and all of its sub-albums.
+        """
+        candidates = sorted(
+            (self._prefix_matches(token) for token in set(tokenize(query))), key=len
+        )
+        if not candidates:
+            return []
+        matches = candidates[0].intersection(*candidates[1:])
+        devices = [self.devices[position] for position in sorted(matches)]
+        if piwigo_type is not None:
+            devices = [d for d in devices if d.piwigo_type == piwigo_type]
+        return devices
+
+    def descendants(self, album_ids: Iterable[int]) -> set[int]:
+        """Return the given albums and all of their sub-albums."""
+        found: set[int] = set()
+        pending = list(album_ids)
+        while pending:
+            album_id = pending.pop()
+            if album_id not in found:
+                found.add(album_id)
+                pending.extend(self.album_children.get(album_id, ()))
+        return found
+
+    def filter_devices(
+        self,
+        max_depth: int = 0,
+        patterns: Iterable[str] = (),
+        parent_ids: Iterable[int] = (),
+    ) -> list[Device]:
+        """Return the album and tag devices kept by the entity filters.
+
+        Tags are always kept.  Albums must be no deeper than max_depth (top
+        level albums are depth 1, 0 means unlimited), match one of the glob
+        patterns against their full path, and be one of parent_ids or below
+        it.  Empty filters keep everything.
+        """
+        patterns = [pattern.casefold() for pattern in patterns]
+        parent_ids = list(parent_ids)
+        subtree = self.descendants(parent_ids) if parent_ids else None
+        devices = []
+        for device in self.devices:
+            if device.device_type != DeviceType.SOCKET:
+                continue
+            if device.piwigo_type == "cat":
+                album_id = int(device.piwigo_id)
+                if max_depth and self.album_depth[album_id] > max_depth:
+                    continue
+                if subtree is not None and album_id not in subtree:
+                    continue
+                if patterns and not any(
+                    fnmatchcase(device_path(device).casefold(), pattern)
+                    for pattern in patterns
+                ):
+                    continue
+            devices.append(device)
+        return devices
@@ -0,0 +1,118 @@
+"""Connection probe.
+
+Measures what one poll of the Piwigo server costs - the login round trip, the
+full_table download and its parse - and recommends polling, batching and
+entity filter options that fit.  Results are kept in the entry options and
+shown in diagnostics.
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+import json
+import math
+import time
+from typing import Any
+
+import requests
+
+from homeassistant.const import CONF_SCAN_INTERVAL
+
+from .api import API, APIConnectionError
+from .const import (
+    CONF_AGGREGATE_ENTITY,
+    CONF_BATCH_WINDOW,
+    CONF_MAX_ALBUM_DEPTH,
+    DEFAULT_SCAN_INTERVAL,
+    MAX_BATCH_WINDOW,
+    PROBE_MAX_ALBUM_SWITCHES,
+)
+from .index import DeviceIndex
+
+# Polling should keep the server busy for at most this share of the time.
+POLL_DUTY_CYCLE = 0.01
+
+# Refreshes slower than this, in seconds, are worth batching switch changes for.
+BATCH_REFRESH_SECONDS = 0.5
+
+
+def run_probe(api: API) -> dict[str, Any]:
+    """Time a login, a full_table download and its parse, run in the executor.
+
+    Raises APIAuthError for bad credentials and APIConnectionError when the
+    server cannot be reached, times out or returns something other than
+    full_table JSON.  Create the API with a timeout, see PROBE_TIMEOUT.
+    """
+    try:
+        start = time.perf_counter()
+        api.connect()
+        login = time.perf_counter()
+        raw = api.get_full_table()
+        download = time.perf_counter()
+        devices = api.parse_full_table(json.loads(raw))
+        index = DeviceIndex(devices)
+        parse = time.perf_counter()
+    except (requests.RequestException, ValueError, KeyError) as err:
+        raise APIConnectionError(f"Error probing {api.host}: {err}") from err
+
+    albums_per_depth = [0] * max(index.album_depth.values(), default=0)
+    for depth in index.album_depth.values():
+        albums_per_depth[depth - 1] += 1
+    return {
+        "probed_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "login_ms": round((login - start) * 1000, 1),
+        "full_table_bytes": len(raw),
+        "download_ms": round((download - login) * 1000, 1),
+        "parse_ms": round((parse - download) * 1000, 1),
+        "devices": len(devices),
+        "albums": len(index.album_depth),
+        "tags": sum(1 for d in devices if d.piwigo_type == "tag"),
+        "albums_per_depth": albums_per_depth,
+    }
+
+
+def recommend_options(probe: dict[str, Any]) -> dict[str, Any]:
+    """Return the options that fit a probe's measured refresh cost.
+
+    The scan interval keeps polling under POLL_DUTY_CYCLE of the time, never
+    below the default.  Slow refreshes get a batching window of about two
+    refreshes.  Catalogs with more albums than PROBE_MAX_ALBUM_SWITCHES get
+    album switches limited to the deepest level that stays under it, with the
+    selection sensor covering the rest.
+    """
+    refresh = (probe["download_ms"] + probe["parse_ms"]) / 1000
+    options: dict[str, Any] = {
+        CONF_SCAN_INTERVAL: max(
+            DEFAULT_SCAN_INTERVAL, 10 * math.ceil(refresh / POLL_DUTY_CYCLE / 10)
+        ),
+        CONF_BATCH_WINDOW: (
+            min(MAX_BATCH_WINDOW, math.ceil(2 * refresh))
+            if refresh >= BATCH_REFRESH_SECONDS
+            else 0
+        ),
+        CONF_MAX_ALBUM_DEPTH: 0,
+    }
+    if probe["albums"] > PROBE_MAX_ALBUM_SWITCHES:
+        depth = 1
+        total = 0
+        for level, count in enumerate(probe["albums_per_depth"], start=1):
+            total += count
+            if total > PROBE_MAX_ALBUM_SWITCHES:
+                break
+            depth = level
+        options[CONF_MAX_ALBUM_DEPTH] = depth
+        options[CONF_AGGREGATE_ENTITY] = True
+    return options
+
+
+def probe_summary(probe: dict[str, Any], recommended: dict[str, Any]) -> str:
+    """Return a one paragraph summary of a probe for the options form."""
+    return (
+        f"Login {probe['login_ms']:.0f} ms, full_table "
+        f"{probe['full_table_bytes'] / 1024:.0f} kB in {probe['download_ms']:.0f} ms, "
+        f"parsed in {probe['parse_ms']:.0f} ms, {probe['albums']} albums and "
+        f"{probe['tags']} tags.  Recommended: scan interval "
+        f"{recommended[CONF_SCAN_INTERVAL]} s, batching window "
+        f"{recommended[CONF_BATCH_WINDOW]} s, maximum album depth "
+        f"{recommended[CONF_MAX_ALBUM_DEPTH] or 'all'}."
+    )
@@ -0,0 +1,259 @@
+"""Profiling and event loop stall detection.
+
+The profile service captures what the integration spends its time on, either
+with cProfile on the event loop thread or by sampling the stacks of every
+thread running integration code, which also covers executor jobs waiting on
+Piwigo.  Reports are written to the config directory.
+
+LoopWatchdog pings the event loop from a thread and logs the integration code
+that was running whenever the loop does not answer within a threshold.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Iterable
+import cProfile
+import io
+import logging
+from pathlib import Path
+import pstats
+import re
+import sys
+import threading
+import time
+from types import FrameType
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import PiwigoWallDisplayCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+PACKAGE_DIR = str(Path(__file__).parent)
+
+# Seconds between stack samples.
+SAMPLE_INTERVAL = 0.005
+
+# Only one profile runs at a time, cProfile cannot be enabled twice.
+_PROFILE_LOCK = asyncio.Lock()
+
+# Sampler and watchdog threads, left out of samples.
+_MONITOR_THREADS: set[int] = set()
+
+
+def _current_frames() -> dict[int, FrameType]:
+    """Return the running frame of every thread."""
+    return sys._current_frames()  # noqa: SLF001
+
+
+def _stack(frame: FrameType | None) -> list[str]:
+    """Return a stack from the outermost integration frame to the innermost.
+
+    Returns an empty list when no integration code is on the stack.
+    """
+    labels: list[str] = []
+    ours = -1
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(PACKAGE_DIR):
+            ours = len(labels)
+        labels.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+        frame = frame.f_back
+    return labels[ours::-1] if ours >= 0 else []
+
+
+class StackSampler:
+    """Counts the stacks of threads running integration code."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        """Initialise."""
+        self.interval = interval
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self.ticks = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"{DOMAIN}_sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampling thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        """Sample every interval until stopped."""
+        _MONITOR_THREADS.add(threading.get_ident())
+        try:
+            while not self._stop.wait(self.interval):
+                self.ticks += 1
+                for thread_id, frame in _current_frames().items():
+                    if thread_id in _MONITOR_THREADS:
+                        continue
+                    if stack := _stack(frame):
+                        self.samples[tuple(stack)] += 1
+        finally:
+            _MONITOR_THREADS.discard(threading.get_ident())
+
+    def report(self) -> str:
+        """Return the samples in collapsed stack format, busiest first.
+
+        Each line is the stack joined by ";" and its sample count, the input
+        format of flame graph tools.
+        """
+        return "".join(
+            f"{';'.join(stack)} {count}\n"
+            for stack, count in self.samples.most_common()
+        )
+
+
+async def async_profile(
+    hass: HomeAssistant,
+    coordinators: Iterable[PiwigoWallDisplayCoordinator],
+    seconds: float,
+    mode: str,
+) -> dict[str, Any]:
+    """Profile the integration for a number of seconds and write a report.
+
+    The coordinators are refreshed at the start so at least one refresh and
+    the entity updates it triggers are captured.
+    """
+    if _PROFILE_LOCK.locked():
+        raise RuntimeError("A profile is already running")
+    async with _PROFILE_LOCK:
+        start = time.monotonic()
+        profiler = cProfile.Profile() if mode == "cprofile" else None
+        sampler = StackSampler() if profiler is None else None
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError as err:
+                # Another profiler, such as Home Assistant's own, is active.
+                raise RuntimeError(f"cProfile cannot be started: {err}") from err
+        else:
+            sampler.start()
+        try:
+            for coordinator in coordinators:
+                await coordinator.async_refresh()
+            await asyncio.sleep(max(0, seconds - (time.monotonic() - start)))
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            else:
+                await hass.async_add_executor_job(sampler.stop)
+
+    stamp = dt_util.now().strftime("%Y%m%d_%H%M%S")
+    path = Path(hass.config.path(f"{DOMAIN}_profile_{stamp}.txt"))
+    response: dict[str, Any] = {
+        "mode": mode,
+        "seconds": round(time.monotonic() - start, 2),
+        "report": str(path),
+    }
+    if profiler is not None:
+        response["stats"] = str(path.with_suffix(".prof"))
+        await hass.async_add_executor_job(_write_cprofile, profiler, path)
+    else:
+        response["ticks"] = sampler.ticks
+        response["samples"] = sampler.samples.total()
+        await hass.async_add_executor_job(path.write_text, sampler.report())
+    _LOGGER.info("Profile written to %s", path)
+    return response
+
+
+def _write_cprofile(profiler: cProfile.Profile, path: Path) -> None:
+    """Write the integration's functions as text and every function as .prof."""
+    profiler.dump_stats(path.with_suffix(".prof"))
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(re.escape(PACKAGE_DIR))
+    path.write_text(output.getvalue())
+
+
+class LoopWatchdog:
+    """Logs stretches where integration code held the event loop too long.
+
+    The loop is pinged every threshold seconds, so stalls are caught once
+    they last between one and two thresholds.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, threshold: float) -> None:
+        """Initialise, call start from the event loop thread."""
+        self.threshold = threshold
+        self.stalls = 0
+        self.longest = 0.0
+        self.last_stall: dict[str, Any] | None = None
+        self._loop = loop
+        self._loop_thread_id: int | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"{DOMAIN}_loop_watchdog", daemon=True
+        )
+
+    def start(self) -> None:
+        """Start watching the event loop."""
+        self._loop_thread_id = threading.get_ident()
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching, the thread exits at its next ping."""
+        self._stop.set()
+
+    def _run(self) -> None:
+        """Ping the loop and inspect its stack when it does not answer."""
+        _MONITOR_THREADS.add(threading.get_ident())
+        try:
+            self._watch()
+        finally:
+            _MONITOR_THREADS.discard(threading.get_ident())
+
+    def _watch(self) -> None:
+        """Ping the loop every threshold until stopped or the loop closes."""
+        while not self._stop.wait(self.threshold):
+            answered = threading.Event()
+            start = time.monotonic()
+            try:
+                self._loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:
+                # The loop has been closed.
+                return
+            if answered.wait(self.threshold):
+                continue
+            stack = _stack(_current_frames().get(self._loop_thread_id))
+            while not answered.wait(self.threshold):
+                if self._stop.is_set():
+                    return
+            held = time.monotonic() - start
+            if stack:
+                self._record(held, stack)
+
+    def _record(self, held: float, stack: list[str]) -> None:
+        """Count and log a stall."""
+        self.stalls += 1
+        self.longest = max(self.longest, held)
+        self.last_stall = {
+            "at": dt_util.utcnow().isoformat(),
+            "seconds": round(held, 3),
+            "stack": stack,
+        }
+        _LOGGER.warning(
+            "Event loop held for %.2f s by %s", held, " > ".join(stack)
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """Return the stall count, longest stall and the last one."""
+        return {
+            "threshold": self.threshold,
+            "stalls": self.stalls,
+            "longest_seconds": round(self.longest, 3),
+            "last_stall": self.last_stall,
+        }
@@ -0,0 +1,75 @@
+"""Selection profiles.
+
+Named snapshots of which albums and tags are enabled plus the display mode,
+stored locally so the whole selection can be switched in one batched write.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .api import Device, DeviceType
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+
+
+def snapshot(devices: list[Device]) -> dict[str, Any]:
+    """Return the enabled state of every album and tag and the mode."""
+    profile: dict[str, Any] = {"states": {}, "mode": None}
+    for device in devices:
+        if device.device_type == DeviceType.SELECT:
+            profile["mode"] = device.state
+        else:
+            profile["states"][device.device_unique_id] = bool(device.state)
+    return profile
+
+
+def diff(profile: dict[str, Any], devices: list[Device]) -> list[tuple[Device, str]]:
+    """Return the set_data calls needed to move devices to a profile.
+
+    Devices missing from the profile, or from the current snapshot, are left
+    alone so that albums added since the profile was saved keep their state.
+    """
+    states: dict[str, bool] = profile["states"]
+    changes: list[tuple[Device, str]] = []
+    for device in devices:
+        if device.device_type == DeviceType.SELECT:
+            mode = profile.get("mode")
+            if mode is not None and mode != device.state:
+                changes.append((device, "true" if mode == "cat" else "false"))
+            continue
+        wanted = states.get(device.device_unique_id)
+        if wanted is not None and wanted != bool(device.state):
+            changes.append((device, "true" if wanted else "false"))
+    return changes
+
+
+class ProfileStore:
+    """Profiles of one config entry, persisted in .storage."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialise."""
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.profiles"
+        )
+        self.profiles: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load the stored profiles."""
+        self.profiles = await self._store.async_load() or {}
+
+    async def async_save_profile(self, name: str, devices: list[Device]) -> None:
+        """Capture the current devices as a named profile."""
+        self.profiles[name] = snapshot(devices)
+        await self._store.async_save(self.profiles)
+
+    async def async_delete_profile(self, name: str) -> bool:
+        """Delete a profile, returning False if it did not exist."""
+        if self.profiles.pop(name, None) is None:
+            return False
+        await self._store.async_save(self.profiles)
+        return True
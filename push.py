@@ -0,0 +1,162 @@
+"""Webhook receiving change notifications pushed by the Piwigo server."""
+
+from __future__ import annotations
+
+from json import JSONDecodeError
+import logging
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import web
+import voluptuous as vol
+
+from homeassistant.components import persistent_notification, webhook
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_WEBHOOK_ID
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.network import NoURLAvailableError
+
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import PiwigoWallDisplayCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# An album or tag in a change list, either {"id": 12, "enabled": true} or a
+# bare id to be fetched with a refresh.
+CHANGE_SCHEMA = vol.Any(
+    vol.Schema(
+        {
+            vol.Required("id"): vol.Coerce(int),
+            vol.Optional("enabled"): vol.Any(bool, int, str),
+        },
+        extra=vol.ALLOW_EXTRA,
+    ),
+    vol.Coerce(int),
+)
+
+CHANGES_SCHEMA = vol.Schema(
+    {
+        vol.Optional("albums"): [CHANGE_SCHEMA],
+        vol.Optional("tags"): [CHANGE_SCHEMA],
+        vol.Optional("mode"): str,
+        vol.Optional("sent_at"): vol.Any(int, float),
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+ALBUM_SCHEMA = vol.Schema(
+    {
+        vol.Required("id"): vol.Coerce(int),
+        vol.Required("name"): str,
+        # PHP encodes an album without children as an empty list.
+        vol.Required("children"): vol.Any(dict, []),
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+TAG_SCHEMA = vol.Schema(
+    {vol.Required("id"): vol.Coerce(int), vol.Required("name"): str},
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+def _album(value: Any) -> Any:
+    """Validate a full_table album and its sub-albums."""
+    ALBUM_SCHEMA(value)
+    children = value["children"]
+    for child in children.values() if isinstance(children, dict) else children:
+        _album(child)
+    return value
+
+
+FULL_TABLE_SCHEMA = vol.Schema(
+    {
+        vol.Required("cats"): {str: _album},
+        vol.Required("tags"): {str: TAG_SCHEMA},
+        vol.Required("mode"): str,
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+def _validate_payload(payload: dict[str, Any]) -> dict[str, Any]:
+    """Return a pushed payload checked against its schema.
+
+    A full_table payload is returned as sent so it parses the same as a
+    polled one.  Raises vol.Invalid.
+    """
+    if "cats" in payload and "tags" in payload:
+        FULL_TABLE_SCHEMA(payload)
+        return payload
+    return CHANGES_SCHEMA(payload)
+
+
+def async_register_webhook(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    coordinator: PiwigoWallDisplayCoordinator,
+) -> None:
+    """Register the push webhook of a config entry, creating its id if needed.
+
+    The webhook is unregistered when the entry unloads or its setup fails.
+    """
+    created = CONF_WEBHOOK_ID not in config_entry.data
+    if created:
+        hass.config_entries.async_update_entry(
+            config_entry,
+            data={**config_entry.data, CONF_WEBHOOK_ID: webhook.async_generate_id()},
+        )
+    webhook_id = config_entry.data[CONF_WEBHOOK_ID]
+
+    async def async_handle_webhook(
+        hass: HomeAssistant, webhook_id: str, request: web.Request
+    ) -> web.Response:
+        """Pass a pushed payload on to the coordinator."""
+        try:
+            payload = await request.json()
+        except (JSONDecodeError, ValueError):
+            return web.Response(status=400, text="Invalid JSON")
+        if not isinstance(payload, dict):
+            return web.Response(status=400, text="Expected a JSON object")
+        try:
+            payload = _validate_payload(payload)
+        except vol.Invalid as err:
+            return web.Response(status=400, text=f"Invalid payload: {err}")
+        await coordinator.async_handle_push(payload)
+        return web.Response(status=200)
+
+    webhook.async_register(
+        hass,
+        DOMAIN,
+        f"Piwigo Wall Display {config_entry.title}",
+        webhook_id,
+        async_handle_webhook,
+    )
+    config_entry.async_on_unload(
+        lambda: webhook.async_unregister(hass, webhook_id)
+    )
+    _LOGGER.debug(
+        "Push webhook for %s registered at %s",
+        config_entry.title,
+        webhook.async_generate_path(webhook_id),
+    )
+    if created:
+        _async_notify_webhook_url(hass, config_entry, webhook_id)
+
+
+def _async_notify_webhook_url(
+    hass: HomeAssistant, config_entry: ConfigEntry, webhook_id: str
+) -> None:
+    """Tell the user, once, where the Piwigo server should push changes to."""
+    try:
+        url = webhook.async_generate_url(hass, webhook_id)
+    except NoURLAvailableError:
+        url = webhook.async_generate_path(webhook_id)
+    _LOGGER.info("Push webhook for %s created at %s", config_entry.title, url)
+    persistent_notification.async_create(
+        hass,
+        f"Configure the Piwigo server to POST change notifications to {url}",
+        title=f"Piwigo Wall Display {config_entry.title}",
+        notification_id=f"{DOMAIN}_{config_entry.entry_id}_webhook",
+    )
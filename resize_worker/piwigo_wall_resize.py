@@ -0,0 +1,29 @@
+"""Wall image downscaling, run in spawned worker processes.
+
+This module is imported by its file name rather than as part of the
+integration, so spawned workers import neither the integration nor Home
+Assistant to unpickle resize_image.  Keep it free of both.
+"""
+
+from __future__ import annotations
+
+import io
+
+
+def resize_image(data: bytes, width: int, height: int) -> bytes:
+    """Downscale an image to fit width x height as JPEG.
+
+    Returns the image unchanged, in whatever format it is, if Pillow is not
+    available or the image is already small enough.
+    """
+    try:
+        from PIL import Image  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return data
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width <= width and image.height <= height:
+            return data
+        image.thumbnail((width, height))
+        output = io.BytesIO()
+        image.convert("RGB").save(output, format="JPEG", quality=90)
+    return output.getvalue()
@@ -0,0 +1,354 @@
+"""Random image selection for the wall display.
+
+ImageSampler picks images from the enabled albums or tags without repeats
+until every image has been shown.  Sources are drawn from an alias table
+weighted by their image count times a per album or tag preference, then an
+image is drawn from the chosen source with a partial Fisher-Yates shuffle, so
+each pick is constant time.  The table is rebuilt from the images left at the
+start of each cycle and whenever a source runs out, so the preferences hold
+between those points rather than on every pick.  A prefetch queue keeps the
+next images ready.
+
+ImageEngine keeps the sampler in step with the coordinator, reading the image
+ids of newly enabled albums and tags from the local image index once it has
+synced, or from Piwigo before that.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable
+import logging
+import random
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.storage import Store
+
+from .api import Device, DeviceType
+from .const import DEFAULT_PREFETCH_SIZE, DOMAIN, SIGNAL_IMAGE_INDEX_UPDATED
+
+if TYPE_CHECKING:
+    from .coordinator import PiwigoWallDisplayCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+
+def source_key(device: Device) -> str:
+    """Return the sampler source key of an album or tag device."""
+    return f"{device.piwigo_type}:{int(device.piwigo_id)}"
+
+
+class AliasTable:
+    """Walker alias table for constant time weighted choice."""
+
+    def __init__(self, keys: list[str], weights: list[float]) -> None:
+        """Build the table, weights must be positive."""
+        count = len(keys)
+        total = sum(weights)
+        self.keys = keys
+        self._prob = [0.0] * count
+        self._alias = [0] * count
+        scaled = [weight * count / total for weight in weights]
+        small = [i for i, weight in enumerate(scaled) if weight < 1.0]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._prob[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def choose(self, rng: random.Random) -> str:
+        """Return a key with probability proportional to its weight."""
+        i = rng.randrange(len(self.keys))
+        return self.keys[i if rng.random() < self._prob[i] else self._alias[i]]
+
+
+class ImageSampler:
+    """Weighted random images without repeats, with a prefetch queue."""
+
+    def __init__(
+        self,
+        prefetch_size: int = DEFAULT_PREFETCH_SIZE,
+        rng: random.Random | None = None,
+    ) -> None:
+        """Initialise."""
+        self.prefetch_size = prefetch_size
+        self.queue: deque[int] = deque()
+        self.weights: dict[str, float] = {}
+        self._rng = rng or random.Random()
+        self._sources: dict[str, list[int]] = {}
+        # Images of each source not shown yet this cycle, drawn from in place.
+        self._remaining: dict[str, list[int]] = {}
+        # Images shown or queued this cycle, an image can be in several sources.
+        self._seen: set[int] = set()
+        self._table: AliasTable | None = None
+        self._last: int | None = None
+
+    def set_sources(self, sources: dict[str, list[int]]) -> None:
+        """Replace the image ids of every source.
+
+        Sources that are unchanged keep their progress through the cycle.
+        Queued images that no longer belong to any source are dropped.
+        """
+        dropped = self._sources.keys() - sources.keys()
+        for key in dropped:
+            del self._remaining[key]
+        for key, image_ids in sources.items():
+            if self._sources.get(key) is not image_ids:
+                if key in self._sources:
+                    dropped.add(key)
+                self._remaining[key] = [i for i in image_ids if i not in self._seen]
+        self._sources = dict(sources)
+        if dropped and self.queue:
+            valid = set().union(*sources.values())
+            self.queue = deque(i for i in self.queue if i in valid)
+        self._build_table()
+        self._fill()
+
+    def set_weights(self, weights: dict[str, float]) -> None:
+        """Set the preference of sources, missing sources weigh 1."""
+        self.weights = dict(weights)
+        self._build_table()
+
+    def next_image(self) -> int | None:
+        """Return the next image id, or None if no source has images."""
+        self._fill()
+        if not self.queue:
+            return None
+        image_id = self._last = self.queue.popleft()
+        self._fill()
+        return image_id
+
+    def _build_table(self) -> None:
+        """Rebuild the alias table over sources with images left."""
+        keys = [key for key, remaining in self._remaining.items() if remaining]
+        self._table = (
+            AliasTable(
+                keys,
+                [
+                    len(self._remaining[key]) * self.weights.get(key, 1.0)
+                    for key in keys
+                ],
+            )
+            if keys
+            else None
+        )
+
+    def _new_cycle(self) -> None:
+        """Start showing every image again in a fresh random order.
+
+        Images still queued from the last cycle sit the new one out, so an
+        image comes round again at the earliest a full queue later.  A
+        selection no bigger than the queue would then repeat one order
+        forever, so it is reshuffled whole, leaving out only the image queued
+        or shown last so it is not shown twice in a row.
+        """
+        selection = set().union(*self._sources.values())
+        if len(selection) > self.prefetch_size:
+            self._seen = set(self.queue)
+        else:
+            last = self.queue[-1] if self.queue else self._last
+            # Unless the last image is the only one.
+            self._seen = {last} if len(selection) > 1 else set()
+        self._remaining = {
+            key: [i for i in image_ids if i not in self._seen]
+            for key, image_ids in self._sources.items()
+        }
+        self._build_table()
+
+    def _draw(self) -> int | None:
+        """Return an image not shown this cycle, starting a new cycle if needed."""
+        new_cycle = False
+        while True:
+            if self._table is None:
+                if new_cycle or not any(self._sources.values()):
+                    return None
+                self._new_cycle()
+                new_cycle = True
+                continue
+            remaining = self._remaining[self._table.choose(self._rng)]
+            if not remaining:
+                # Source ran out since the table was built.
+                self._build_table()
+                continue
+            i = self._rng.randrange(len(remaining))
+            remaining[i], remaining[-1] = remaining[-1], remaining[i]
+            image_id = remaining.pop()
+            if not remaining:
+                # Keep drawing the other sources by their stated weights.
+                self._build_table()
+            if image_id not in self._seen:
+                self._seen.add(image_id)
+                return image_id
+
+    def _fill(self) -> None:
+        """Top the prefetch queue up to prefetch_size images."""
+        while len(self.queue) < self.prefetch_size:
+            image_id = self._draw()
+            if image_id is None:
+                return
+            self.queue.append(image_id)
+
+
+class ImageEngine:
+    """Keeps an ImageSampler in step with the enabled albums or tags."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: PiwigoWallDisplayCoordinator,
+        config_entry: ConfigEntry,
+    ) -> None:
+        """Initialise."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self.config_entry = config_entry
+        self.entry_id = config_entry.entry_id
+        self.sampler = ImageSampler()
+        self.current: int | None = None
+        self._image_ids: dict[str, list[int]] = {}
+        self._enabled: list[str] | None = None
+        self._listeners: list[Callable[[], None]] = []
+        self._sync_lock = asyncio.Lock()
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._store: Store[dict[str, float]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{self.entry_id}.weights"
+        )
+
+    async def async_setup(self) -> None:
+        """Load the weights and follow the coordinator.
+
+        The image ids are fetched in the background so setup does not wait on
+        one Piwigo listing per enabled album.
+        """
+        self.sampler.set_weights(await self._store.async_load() or {})
+        self._unsubs = [
+            self.coordinator.async_add_listener(self._handle_coordinator_update),
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_IMAGE_INDEX_UPDATED.format(self.entry_id),
+                self._handle_index_update,
+            ),
+        ]
+        self._async_start_sync()
+
+    @callback
+    def _async_start_sync(self, refetch: bool = False) -> None:
+        """Sync in a task of the config entry, cancelled when it unloads."""
+        self.config_entry.async_create_background_task(
+            self.hass, self.async_sync(refetch), f"{DOMAIN} image sampler sync"
+        )
+
+    @callback
+    def async_unload(self) -> None:
+        """Stop following the coordinator and image index."""
+        while self._unsubs:
+            self._unsubs.pop()()
+
+    def enabled_sources(self) -> list[Device]:
+        """Return the enabled albums, or tags when the mode select is on Tag."""
+        devices = self.coordinator.data.devices
+        mode = next(
+            (d.state for d in devices if d.device_type == DeviceType.SELECT), "cat"
+        )
+        piwigo_type = "cat" if mode == "cat" else "tag"
+        return [
+            device
+            for device in devices
+            if device.piwigo_type == piwigo_type and device.state
+        ]
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Resync the sampler when the enabled set changes."""
+        if [source_key(d) for d in self.enabled_sources()] != self._enabled:
+            self._async_start_sync()
+
+    @callback
+    def _handle_index_update(self) -> None:
+        """Reload every source from the freshly synced image index."""
+        self._async_start_sync(refetch=True)
+
+    async def async_sync(self, refetch: bool = False) -> None:
+        """Fetch the images of newly enabled sources and update the sampler."""
+        async with self._sync_lock:
+            if refetch:
+                self._image_ids.clear()
+            devices = self.enabled_sources()
+            missing = [d for d in devices if source_key(d) not in self._image_ids]
+            if missing:
+                try:
+                    self._image_ids.update(
+                        await self.hass.async_add_executor_job(
+                            self._fetch_image_ids, missing
+                        )
+                    )
+                except Exception as err:  # pylint: disable=broad-except
+                    _LOGGER.warning("Error fetching image ids from Piwigo: %s", err)
+                    return
+            self._enabled = [source_key(d) for d in devices]
+            self.sampler.set_sources(
+                {key: self._image_ids[key] for key in self._enabled}
+            )
+            _LOGGER.debug(
+                "Sampling %s sources, fetched %s", len(self._enabled), len(missing)
+            )
+
+    def _fetch_image_ids(self, devices: list[Device]) -> dict[str, list[int]]:
+        """Get the image ids of albums and tags, run in the executor."""
+        image_index = self.coordinator.image_index
+        if image_index is not None and image_index.synced:
+            albums = self.coordinator.data.index
+            return {
+                source_key(device): (
+                    image_index.album_image_ids(
+                        list(albums.descendants([int(device.piwigo_id)]))
+                    )
+                    if device.piwigo_type == "cat"
+                    else image_index.tag_image_ids(int(device.piwigo_id))
+                )
+                for device in devices
+            }
+        api = self.coordinator.api
+        api.ensure_logged_in()
+        return {
+            source_key(device): (
+                api.get_album_image_ids(int(device.piwigo_id))
+                if device.piwigo_type == "cat"
+                else api.get_tag_image_ids(int(device.piwigo_id))
+            )
+            for device in devices
+        }
+
+    async def async_set_weights(self, weights: dict[str, float]) -> None:
+        """Merge in source preferences and store them."""
+        merged = self.sampler.weights | weights
+        self.sampler.set_weights(merged)
+        await self._store.async_save(merged)
+
+    @callback
+    def async_next_image(self) -> int | None:
+        """Advance to the next image and notify listeners."""
+        self.current = self.sampler.next_image()
+        for listener in self._listeners:
+            listener()
+        return self.current
+
+    @callback
+    def async_add_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call listener whenever the current image changes."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def status(self) -> dict[str, Any]:
+        """Return the current image and the prefetched ids."""
+        return {"image_id": self.current, "queue": list(self.sampler.queue)}
@@ -59,6 +59,11 @@ class PiwigoWallDisplaySelect(CoordinatorEntity, SelectEntity):
 
     _attr_has_entity_name = True
 
+    _attr_options = ["Album", "Tag"]
+
+    # The simple name never changes, keep it out of the recorder.
+    _unrecorded_attributes = frozenset({"simple_name"})
+
     def __init__(
         self, coordinator: PiwigoWallDisplayCoordinator, device: Device, parameter: str
     ) -> None:
@@ -67,85 +72,64 @@ class PiwigoWallDisplaySelect(CoordinatorEntity, SelectEntity):
         self.device = device
         self.device_id = device.device_id
         self.parameter = parameter
+        self._written_available: bool | None = None
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Update sensor with latest data from coordinator."""
-        # This method is called by your DataUpdateCoordinator when a successful update runs.
-        self.device = self.coordinator.get_device_by_id(
-            self.device.device_type, self.device.device_unique_id
-        )
-        _LOGGER.debug("Device: %s", self.device)
-        self.async_write_ha_state()
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information."""
+        # ----------------------------------------------------------------------------
+        # All entities must have a unique id across your whole Home Assistant server.
+        # Think carefully what you want this to be as changing it later will cause HA
+        # to create new entities.
+        #
+        # The unique id and device info never change for a device, so they are
+        # built once here instead of on every state write.
+        # ----------------------------------------------------------------------------
+        self._attr_unique_id = f"{DOMAIN}-{device.device_unique_id}"
 
         # ----------------------------------------------------------------------------
         # Identifiers are what group entities into the same device.
-        # If your device is created elsewhere, you can just specify the indentifiers
-        # parameter to link an entity to a device.
-        # If your device connects via another device, add via_device parameter with
-        # the indentifiers of that device.
-        #
         # Device identifiers should be unique, so use your integration name (DOMAIN)
         # and a device uuid, mac address or some other unique attribute.
         # ----------------------------------------------------------------------------
-        return DeviceInfo(
-            name=f"Wall Display Options{self.device.device_id}",
+        self._attr_device_info = DeviceInfo(
+            name=f"Wall Display Options{device.device_id}",
             manufacturer="ACME Manufacturer",
             model="piwigo",
             sw_version="1.0",
             identifiers={
                 (
                     DOMAIN,
-                    f"{self.coordinator.data.controller_name}-{self.device.device_id}",
+                    f"{coordinator.data.controller_name}-{device.device_id}",
                 )
             },
         )
+        self._update_from_device()
 
-    @property
-    def name(self) -> str:
-        """Return the name of the sensor."""
-        return self.device.name  # self.parameter.replace("_", " ").title()
+    async def async_added_to_hass(self) -> None:
+        """Remember the availability of the first state write, made next."""
+        await super().async_added_to_hass()
+        self._written_available = self.available
 
-    @property
-    def unique_id(self) -> str:
-        """Return unique id."""
-
-        # ----------------------------------------------------------------------------
-        # All entities must have a unique id across your whole Home Assistant server -
-        # and that also goes for anyone using your integration who may have many other
-        # integrations loaded.
-        #
-        # Think carefully what you want this to be as changing it later will cause HA
-        # to create new entities.
-        #
-        # It is recommended to have your integration name (DOMAIN), some unique id
-        # from your device such as a UUID, MAC address etc (not IP address) and then
-        # something unique to your entity (like name - as this would be unique on a
-        # device)
-        #
-        # If in your situation you have some hub that connects to devices which then
-        # you want to create multiple sensors for each device, you would do something
-        # like.
-        #
-        # f"{DOMAIN}-{HUB_MAC_ADDRESS}-{DEVICE_UID}-{ENTITY_NAME}""
-        #
-        # This is even more important if your integration supports multiple instances.
-        # ----------------------------------------------------------------------------
-        return f"{DOMAIN}-{self.device.device_unique_id}"
-
-    @property
-    def options(self) -> list:
-        """Return the list of options."""
-        return ["Album", "Tag"]
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update sensor with latest data from coordinator."""
+        # This method is called by your DataUpdateCoordinator when a successful update runs.
+        device = self.coordinator.get_device_by_id(
+            self.device.device_type, self.device.device_unique_id
+        )
+        if device is not None and device != self.device:
+            self.device = device
+            self._update_from_device()
+            _LOGGER.debug("Device: %s", self.device)
+        elif self.available == self._written_available:
+            # Skip the state write when nothing changed.
+            return
+        self._written_available = self.available
+        self.async_write_ha_state()
 
-    @property
-    def current_option(self) -> str:
-        """Return the current state."""
-        return "Album" if self.device.state == "cat" else "Tag"
+    def _update_from_device(self) -> None:
+        """Set the entity attributes from the current device."""
+        self._attr_name = self.device.name
+        self._attr_current_option = "Album" if self.device.state == "cat" else "Tag"
+        self._attr_extra_state_attributes = {"simple_name": self.device.simple_name}
 
     async def async_select_option(self, option: str) -> None:
         """Set the state to either 'album' or 'tag'."""
@@ -157,15 +141,3 @@ class PiwigoWallDisplaySelect(CoordinatorEntity, SelectEntity):
             value,
         )
         await self.coordinator.async_refresh()
-
-    @property
-    def extra_state_attributes(self):
-        """Return the extra state attributes."""
-        # Add any additional attributes you want on your sensor.
-        attrs = {}
-        #    attrs["last_rebooted"] = self.coordinator.get_device_parameter(
-        #        self.device_id, "last_reboot"
-        #    )
-        # attrs["last_seen"] = datetime.utcnow()
-        attrs["simple_name"] = self.device.simple_name
-        return attrs
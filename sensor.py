@@ -0,0 +1,202 @@
+"""Sensor setup for our Integration."""
+
+import asyncio
+import logging
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .api import DeviceType
+from .const import (
+    CONF_AGGREGATE_ENTITY,
+    DEFAULT_AGGREGATE_ENTITY,
+    DOMAIN,
+    SIGNAL_IMAGE_INDEX_UPDATED,
+)
+from .coordinator import PiwigoWallDisplayCoordinator
+from .coverage import CoverageEngine
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+):
+    """Set up the Sensors."""
+    # This gets the data update coordinator from hass.data as specified in your __init__.py
+    coordinator: PiwigoWallDisplayCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ].coordinator
+
+    # ----------------------------------------------------------------------------
+    # The aggregate selection sensor holds the enabled set of the whole catalog
+    # in one entity, independent of which album switches the filters create.
+    # ----------------------------------------------------------------------------
+    sensors: list[SensorEntity] = [PiwigoWallDisplayCoverageSensor(coordinator)]
+    if config_entry.options.get(CONF_AGGREGATE_ENTITY, DEFAULT_AGGREGATE_ENTITY):
+        sensors.append(PiwigoWallDisplaySelectionSensor(coordinator))
+    async_add_entities(sensors)
+
+
+def _device_info(coordinator: PiwigoWallDisplayCoordinator) -> DeviceInfo:
+    """Return the device the integration level sensors belong to."""
+    return DeviceInfo(
+        name="Wall Display Options1",
+        manufacturer="ACME Manufacturer",
+        model="piwigo",
+        sw_version="1.0",
+        identifiers={(DOMAIN, f"{coordinator.data.controller_name}-1")},
+    )
+
+
+class PiwigoWallDisplaySelectionSensor(CoordinatorEntity, SensorEntity):
+    """Number of enabled albums and tags, with their ids as attributes.
+
+    Change the selection with the set_selection service.
+    """
+
+    _attr_has_entity_name = True
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:image-multiple"
+    # The id lists can hold thousands of entries, keep them out of the recorder.
+    _unrecorded_attributes = frozenset({"enabled_album_ids", "enabled_tag_ids"})
+
+    def __init__(self, coordinator: PiwigoWallDisplayCoordinator) -> None:
+        """Initialise entity."""
+        super().__init__(coordinator)
+        self._attr_name = "Piwigo_selection"
+        self._attr_unique_id = (
+            f"{DOMAIN}-{coordinator.data.controller_name}_selection"
+        )
+        self._attr_device_info = _device_info(coordinator)
+        self._update_from_data()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update sensor with latest data from coordinator."""
+        self._update_from_data()
+        self.async_write_ha_state()
+
+    def _update_from_data(self) -> None:
+        """Summarise the enabled set of the current snapshot."""
+        albums: list[int] = []
+        tags: list[int] = []
+        mode = None
+        for device in self.coordinator.data.devices:
+            if device.device_type == DeviceType.SELECT:
+                mode = device.state
+            elif device.state:
+                (albums if device.piwigo_type == "cat" else tags).append(
+                    int(device.piwigo_id)
+                )
+        self._attr_native_value = len(albums) + len(tags)
+        self._attr_extra_state_attributes = {
+            "mode": mode,
+            "enabled_album_count": len(albums),
+            "enabled_tag_count": len(tags),
+            "enabled_album_ids": sorted(albums),
+            "enabled_tag_ids": sorted(tags),
+        }
+
+
+class PiwigoWallDisplayCoverageSensor(CoordinatorEntity, SensorEntity):
+    """Number of distinct images the wall rotates through.
+
+    Counted from the local image index once it has synced.  Attributes give
+    the images of the enabled albums and tags, their overlap and union.
+    """
+
+    _attr_has_entity_name = True
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:image-filter-center-focus"
+    _attr_native_unit_of_measurement = "images"
+
+    def __init__(self, coordinator: PiwigoWallDisplayCoordinator) -> None:
+        """Initialise entity."""
+        super().__init__(coordinator)
+        self._attr_name = "Piwigo_coverage"
+        self._attr_unique_id = f"{DOMAIN}-{coordinator.data.controller_name}_coverage"
+        self._attr_device_info = _device_info(coordinator)
+        self._engine: CoverageEngine | None = None
+        self._selection: tuple | None = None
+        self._lock = asyncio.Lock()
+
+    async def async_added_to_hass(self) -> None:
+        """Follow image index syncs."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_IMAGE_INDEX_UPDATED.format(self.coordinator.entry_id),
+                self._handle_index_update,
+            )
+        )
+        image_index = self.coordinator.image_index
+        if image_index is not None and image_index.synced:
+            self._handle_index_update()
+
+    @callback
+    def _handle_index_update(self) -> None:
+        """Drop the image id sets loaded from the previous index sync."""
+        self.hass.async_create_task(self._async_update(rebuild=True))
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Recount when the enabled albums, tags or mode change."""
+        if self._selection != self._current_selection():
+            self.hass.async_create_task(self._async_update())
+        else:
+            self.async_write_ha_state()
+
+    def _current_selection(self) -> tuple[frozenset[int], frozenset[int], str]:
+        """Return the enabled album ids with sub-albums, tag ids and the mode."""
+        albums: list[int] = []
+        tags: list[int] = []
+        mode = "cat"
+        for device in self.coordinator.data.devices:
+            if device.device_type == DeviceType.SELECT:
+                mode = device.state
+            elif device.state:
+                (albums if device.piwigo_type == "cat" else tags).append(
+                    int(device.piwigo_id)
+                )
+        return (
+            frozenset(self.coordinator.data.index.descendants(albums)),
+            frozenset(tags),
+            mode,
+        )
+
+    async def _async_update(self, rebuild: bool = False) -> None:
+        """Recount in the executor, forgetting loaded image id sets if asked.
+
+        The engine loads the sets of newly enabled albums and tags from the
+        image index as it needs them.
+        """
+        async with self._lock:
+            if rebuild:
+                if self._engine is None:
+                    image_index = self.coordinator.image_index
+                    self._engine = CoverageEngine(
+                        lambda piwigo_type, ids: image_index.memberships(
+                            "albums" if piwigo_type == "cat" else "tags", ids
+                        )
+                    )
+                else:
+                    self._engine.clear()
+            if self._engine is None:
+                return
+            selection = self._current_selection()
+            counts = await self.hass.async_add_executor_job(
+                self._engine.compute, *selection
+            )
+            self._selection = selection
+            self._attr_native_value = counts.pop("images")
+            self._attr_extra_state_attributes = counts
+            self.async_write_ha_state()
@@ -0,0 +1,496 @@
+"""Services for the Piwigo Wall Display integration."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from functools import partial
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+
+from homeassistant.const import Platform
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.importlib import async_import_module
+
+from .api import Device, DeviceType
+from .const import (
+    ATTR_ALBUM_IDS,
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_DATE_FROM,
+    ATTR_DATE_TO,
+    ATTR_DURATION,
+    ATTR_ENABLED,
+    ATTR_EXCLUSIVE,
+    ATTR_FULL,
+    ATTR_LIMIT,
+    ATTR_MODE,
+    ATTR_NAME,
+    ATTR_QUERY,
+    ATTR_TAG_IDS,
+    ATTR_TYPE,
+    ATTR_WEIGHT,
+    CONF_STALL_THRESHOLD,
+    DATA_WATCHDOG,
+    DEFAULT_STALL_THRESHOLD,
+    DOMAIN,
+    PROFILE_MODES,
+    SEARCH_TYPES,
+    SERVICE_BULK_ENABLE,
+    SERVICE_DELETE_PROFILE,
+    SERVICE_NEXT_IMAGE,
+    SERVICE_QUERY_IMAGES,
+    SERVICE_RESTORE_PROFILE,
+    SERVICE_RUN_PROFILER,
+    SERVICE_SAVE_PROFILE,
+    SERVICE_SEARCH,
+    SERVICE_SET_SELECTION,
+    SERVICE_SET_WEIGHT,
+    SERVICE_SYNC_INDEX,
+)
+from .profiles import diff
+
+if TYPE_CHECKING:
+    from . import RuntimeData
+    from .coordinator import PiwigoWallDisplayCoordinator
+    from .profiler import LoopWatchdog
+
+_LOGGER = logging.getLogger(__name__)
+
+SEARCH_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_QUERY): cv.string,
+        vol.Optional(ATTR_TYPE): vol.In(list(SEARCH_TYPES)),
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    }
+)
+
+BULK_ENABLE_SCHEMA = SEARCH_SCHEMA.extend(
+    {vol.Optional(ATTR_ENABLED, default=True): cv.boolean}
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_NAME): cv.string,
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    }
+)
+
+SET_SELECTION_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ALBUM_IDS, default=[]): vol.All(
+            cv.ensure_list, [vol.Coerce(int)]
+        ),
+        vol.Optional(ATTR_TAG_IDS, default=[]): vol.All(
+            cv.ensure_list, [vol.Coerce(int)]
+        ),
+        vol.Optional(ATTR_ENABLED, default=True): cv.boolean,
+        vol.Optional(ATTR_EXCLUSIVE, default=False): cv.boolean,
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    }
+)
+
+SET_WEIGHT_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ALBUM_IDS, default=[]): vol.All(
+            cv.ensure_list, [vol.Coerce(int)]
+        ),
+        vol.Optional(ATTR_TAG_IDS, default=[]): vol.All(
+            cv.ensure_list, [vol.Coerce(int)]
+        ),
+        vol.Required(ATTR_WEIGHT): vol.All(vol.Coerce(float), vol.Range(min=0.01)),
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    }
+)
+
+ENTRY_SCHEMA = vol.Schema({vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string})
+
+SYNC_INDEX_SCHEMA = ENTRY_SCHEMA.extend(
+    {vol.Optional(ATTR_FULL, default=False): cv.boolean}
+)
+
+QUERY_IMAGES_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ALBUM_IDS): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+        vol.Optional(ATTR_TAG_IDS): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+        vol.Optional(ATTR_DATE_FROM): cv.date,
+        vol.Optional(ATTR_DATE_TO): cv.date,
+        vol.Optional(ATTR_LIMIT, default=100): vol.All(
+            vol.Coerce(int), vol.Range(min=0)
+        ),
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    }
+)
+
+RUN_PROFILER_SCHEMA = ENTRY_SCHEMA.extend(
+    {
+        vol.Optional(ATTR_DURATION, default=30): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=600)
+        ),
+        vol.Optional(ATTR_MODE, default=PROFILE_MODES[0]): vol.In(PROFILE_MODES),
+    }
+)
+
+
+def _runtime_data(hass: HomeAssistant, call: ServiceCall) -> list[RuntimeData]:
+    """Return the runtime data of the entries targeted by a service call."""
+    runtime_data = hass.data.get(DOMAIN, {})
+    if entry_id := call.data.get(ATTR_CONFIG_ENTRY_ID):
+        if entry_id not in runtime_data:
+            raise ServiceValidationError(f"Config entry {entry_id} is not loaded")
+        return [runtime_data[entry_id]]
+    return list(runtime_data.values())
+
+
+def _coordinators(
+    hass: HomeAssistant, call: ServiceCall
+) -> list[PiwigoWallDisplayCoordinator]:
+    """Return the coordinators targeted by a service call."""
+    return [data.coordinator for data in _runtime_data(hass, call)]
+
+
+def _search(
+    coordinator: PiwigoWallDisplayCoordinator, call: ServiceCall
+) -> list[Device]:
+    """Run the search of a service call against one coordinator."""
+    piwigo_type = SEARCH_TYPES.get(call.data.get(ATTR_TYPE))
+    return coordinator.data.index.search(call.data[ATTR_QUERY], piwigo_type)
+
+
+def _matches_response(hass: HomeAssistant, devices: list[Device]) -> dict:
+    """Return the ids of matched devices for a service response."""
+    registry = er.async_get(hass)
+    return {
+        "album_ids": [int(d.piwigo_id) for d in devices if d.piwigo_type == "cat"],
+        "tag_ids": [int(d.piwigo_id) for d in devices if d.piwigo_type == "tag"],
+        "entity_ids": [
+            entity_id
+            for d in devices
+            if (
+                entity_id := registry.async_get_entity_id(
+                    Platform.SWITCH, DOMAIN, f"{DOMAIN}-{d.device_unique_id}"
+                )
+            )
+        ],
+    }
+
+
+def _selection_changes(
+    devices: list[Device],
+    album_ids: set[int],
+    tag_ids: set[int],
+    enabled: bool,
+    exclusive: bool,
+) -> list[tuple[Device, str]]:
+    """Return the set_data calls for a set_selection service call.
+
+    Listed albums and tags are set to enabled.  When exclusive, every other
+    album and tag is set to the opposite state.
+    """
+    changes: list[tuple[Device, str]] = []
+    for device in devices:
+        if device.device_type != DeviceType.SOCKET:
+            continue
+        listed = album_ids if device.piwigo_type == "cat" else tag_ids
+        if int(device.piwigo_id) in listed:
+            wanted = enabled
+        elif exclusive:
+            wanted = not enabled
+        else:
+            continue
+        if bool(device.state) != wanted:
+            changes.append((device, "true" if wanted else "false"))
+    return changes
+
+
+def _query_args(data: RuntimeData, call: ServiceCall) -> dict:
+    """Return ImageIndex.query arguments for a query_images service call.
+
+    Without album or tag ids the enabled albums, or tags in Tag mode, are used.
+    Albums include their sub-albums and date_to is inclusive.
+    """
+    album_ids = call.data.get(ATTR_ALBUM_IDS)
+    tag_ids = call.data.get(ATTR_TAG_IDS)
+    if album_ids is None and tag_ids is None:
+        enabled = data.images.enabled_sources()
+        album_ids = [int(d.piwigo_id) for d in enabled if d.piwigo_type == "cat"]
+        tag_ids = [int(d.piwigo_id) for d in enabled if d.piwigo_type == "tag"]
+        if not album_ids:
+            album_ids = None
+        elif not tag_ids:
+            tag_ids = None
+    if album_ids is not None:
+        album_ids = list(data.coordinator.data.index.descendants(album_ids))
+    date_from: date | None = call.data.get(ATTR_DATE_FROM)
+    date_to: date | None = call.data.get(ATTR_DATE_TO)
+    return {
+        "album_ids": album_ids,
+        "tag_ids": tag_ids,
+        "date_from": None if date_from is None else f"{date_from} 00:00:00",
+        "date_to": (
+            None if date_to is None else f"{date_to + timedelta(days=1)} 00:00:00"
+        ),
+        "limit": call.data[ATTR_LIMIT],
+    }
+
+
+async def _async_update_watchdog(hass: HomeAssistant) -> None:
+    """Run one loop watchdog at the lowest stall threshold of loaded entries.
+
+    The watchdog is restarted when the threshold changes and stopped when no
+    loaded entry has one.  The profiler module is imported when it first starts.
+    """
+    loaded = hass.data.get(DOMAIN, {})
+    thresholds = [
+        threshold
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.entry_id in loaded
+        and (
+            threshold := entry.options.get(
+                CONF_STALL_THRESHOLD, DEFAULT_STALL_THRESHOLD
+            )
+        )
+    ]
+    threshold = min(thresholds) / 1000 if thresholds else None
+    watchdog: LoopWatchdog | None = hass.data.get(DATA_WATCHDOG)
+    if watchdog is not None:
+        if watchdog.threshold == threshold:
+            return
+        watchdog.stop()
+        del hass.data[DATA_WATCHDOG]
+    if threshold is not None:
+        profiler = await async_import_module(hass, f"{__package__}.profiler")
+        watchdog = profiler.LoopWatchdog(hass.loop, threshold)
+        watchdog.start()
+        hass.data[DATA_WATCHDOG] = watchdog
+
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services and start the loop watchdog."""
+    await _async_update_watchdog(hass)
+    if hass.services.has_service(DOMAIN, SERVICE_SEARCH):
+        return
+
+    async def async_search(call: ServiceCall) -> ServiceResponse:
+        """Return the albums and tags matching a query."""
+        devices: list[Device] = []
+        for coordinator in _coordinators(hass, call):
+            devices.extend(_search(coordinator, call))
+        return _matches_response(hass, devices)
+
+    async def async_bulk_enable(call: ServiceCall) -> ServiceResponse:
+        """Enable or disable every album and tag matching a query."""
+        devices: list[Device] = []
+        changed = 0
+        for coordinator in _coordinators(hass, call):
+            matches = _search(coordinator, call)
+            changed += await coordinator.async_set_enabled(
+                matches, call.data[ATTR_ENABLED]
+            )
+            devices.extend(matches)
+        _LOGGER.debug(
+            "Bulk enable matched %s devices, changed %s", len(devices), changed
+        )
+        return _matches_response(hass, devices) | {"changed": changed}
+
+    async def async_set_selection(call: ServiceCall) -> ServiceResponse:
+        """Enable or disable albums and tags given by id lists."""
+        changed = 0
+        for coordinator in _coordinators(hass, call):
+            changed += await coordinator.async_apply_changes(
+                _selection_changes(
+                    coordinator.data.devices,
+                    set(call.data[ATTR_ALBUM_IDS]),
+                    set(call.data[ATTR_TAG_IDS]),
+                    call.data[ATTR_ENABLED],
+                    call.data[ATTR_EXCLUSIVE],
+                )
+            )
+        return {"changed": changed}
+
+    async def async_next_image(call: ServiceCall) -> ServiceResponse:
+        """Advance the wall to the next random image."""
+        response = {}
+        for data in _runtime_data(hass, call):
+            data.images.async_next_image()
+            response[data.images.entry_id] = data.images.status()
+        return response
+
+    async def async_set_weight(call: ServiceCall) -> None:
+        """Set how often albums and tags are picked relative to their size."""
+        weight = call.data[ATTR_WEIGHT]
+        weights = {f"cat:{i}": weight for i in call.data[ATTR_ALBUM_IDS]}
+        weights |= {f"tag:{i}": weight for i in call.data[ATTR_TAG_IDS]}
+        for data in _runtime_data(hass, call):
+            await data.images.async_set_weights(weights)
+
+    async def async_sync_index(call: ServiceCall) -> ServiceResponse:
+        """Crawl new images, or all images when full, into the image index."""
+        return {
+            data.images.entry_id: await data.coordinator.async_sync_index(
+                call.data[ATTR_FULL]
+            )
+            for data in _runtime_data(hass, call)
+        }
+
+    async def async_query_images(call: ServiceCall) -> ServiceResponse:
+        """Count and list images from the local image index."""
+        response = {}
+        for data in _runtime_data(hass, call):
+            image_index = data.coordinator.image_index
+            if image_index is None or not image_index.synced:
+                raise ServiceValidationError("The image index has not synced yet")
+            start = time.perf_counter()
+            count, image_ids = await hass.async_add_executor_job(
+                partial(image_index.query, **_query_args(data, call))
+            )
+            response[data.images.entry_id] = {
+                "count": count,
+                "image_ids": image_ids,
+                "query_ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+        return response
+
+    async def async_run_profiler(call: ServiceCall) -> ServiceResponse:
+        """Profile refreshes and entity updates and write the report."""
+        profiler = await async_import_module(hass, f"{__package__}.profiler")
+        try:
+            return await profiler.async_profile(
+                hass,
+                _coordinators(hass, call),
+                call.data[ATTR_DURATION],
+                call.data[ATTR_MODE],
+            )
+        except RuntimeError as err:
+            raise ServiceValidationError(str(err)) from err
+
+    async def async_save_profile(call: ServiceCall) -> None:
+        """Save the current albums, tags and mode as a named profile."""
+        for data in _runtime_data(hass, call):
+            await data.profiles.async_save_profile(
+                call.data[ATTR_NAME], data.coordinator.data.devices
+            )
+
+    async def async_restore_profile(call: ServiceCall) -> ServiceResponse:
+        """Apply the difference between a profile and the current state."""
+        name = call.data[ATTR_NAME]
+        targets = [
+            data for data in _runtime_data(hass, call) if name in data.profiles.profiles
+        ]
+        if not targets:
+            raise ServiceValidationError(f"Profile {name} does not exist")
+        changed = 0
+        for data in targets:
+            changed += await data.coordinator.async_apply_changes(
+                diff(data.profiles.profiles[name], data.coordinator.data.devices)
+            )
+        _LOGGER.debug("Restored profile %s with %s changes", name, changed)
+        return {"changed": changed}
+
+    async def async_delete_profile(call: ServiceCall) -> None:
+        """Delete a named profile."""
+        name = call.data[ATTR_NAME]
+        deleted = [
+            await data.profiles.async_delete_profile(name)
+            for data in _runtime_data(hass, call)
+        ]
+        if not any(deleted):
+            raise ServiceValidationError(f"Profile {name} does not exist")
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SEARCH,
+        async_search,
+        schema=SEARCH_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_ENABLE,
+        async_bulk_enable,
+        schema=BULK_ENABLE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_SELECTION,
+        async_set_selection,
+        schema=SET_SELECTION_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_NEXT_IMAGE,
+        async_next_image,
+        schema=ENTRY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_WEIGHT, async_set_weight, schema=SET_WEIGHT_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SYNC_INDEX,
+        async_sync_index,
+        schema=SYNC_INDEX_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_IMAGES,
+        async_query_images,
+        schema=QUERY_IMAGES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RUN_PROFILER,
+        async_run_profiler,
+        schema=RUN_PROFILER_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SAVE_PROFILE, async_save_profile, schema=PROFILE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RESTORE_PROFILE,
+        async_restore_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_DELETE_PROFILE, async_delete_profile, schema=PROFILE_SCHEMA
+    )
+
+
+async def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove the integration services once the last entry is unloaded.
+
+    The loop watchdog follows the entries still loaded.
+    """
+    await _async_update_watchdog(hass)
+    if hass.data.get(DOMAIN):
+        return
+    for service in (
+        SERVICE_SEARCH,
+        SERVICE_BULK_ENABLE,
+        SERVICE_SET_SELECTION,
+        SERVICE_NEXT_IMAGE,
+        SERVICE_SET_WEIGHT,
+        SERVICE_SYNC_INDEX,
+        SERVICE_QUERY_IMAGES,
+        SERVICE_RUN_PROFILER,
+        SERVICE_SAVE_PROFILE,
+        SERVICE_RESTORE_PROFILE,
+        SERVICE_DELETE_PROFILE,
+    ):
+        hass.services.async_remove(DOMAIN, service)
@@ -1,18 +1,32 @@
 """Switch setup for our Integration."""
 
+import asyncio
+
 # from datetime import datetime
 import logging
+import time
 from typing import Any
 
 from homeassistant.components.switch import SwitchDeviceClass, SwitchEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_platform, entity_registry as er
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .api import Device, DeviceType
-from .const import DOMAIN
+from .api import Device
+from .const import (
+    CONF_INCLUDE_PATTERNS,
+    CONF_MAX_ALBUM_DEPTH,
+    CONF_PARENT_ALBUM_IDS,
+    DEFAULT_INCLUDE_PATTERNS,
+    DEFAULT_MAX_ALBUM_DEPTH,
+    DEFAULT_PARENT_ALBUM_IDS,
+    DOMAIN,
+    SETUP_CHUNK_SIZE,
+    SETUP_LAG_INTERVAL,
+)
 from .coordinator import PiwigoWallDisplayCoordinator
 
 _LOGGER = logging.getLogger(__name__)
@@ -37,15 +51,102 @@ async def async_setup_entry(
     # structured
     # ----------------------------------------------------------------------------
     # print("setting up socket")
-    switches = [
-        PiwigoWallDisplaySwitch(coordinator, device, "state")
-        for device in coordinator.data.devices
-        if device.device_type == DeviceType.SOCKET  # for device in coordinator.data
-        # if device.get("device_type") == "SOCKET"
-    ]
+    devices = _included_devices(coordinator, config_entry)
+
+    # Remove switches left in the registry by albums the filters now exclude.
+    _remove_excluded_switches(hass, config_entry, devices)
 
-    # Create the binary sensors.
-    async_add_entities(switches)
+    # ----------------------------------------------------------------------------
+    # Create the switches in chunks, waiting for each to be added and its
+    # states written before the next, so a large catalog does not stall the
+    # event loop.  Tags and top level albums come first so the most used
+    # switches are available soonest.
+    # ----------------------------------------------------------------------------
+    depth = coordinator.data.index.album_depth
+    devices.sort(
+        key=lambda d: depth[int(d.piwigo_id)] if d.piwigo_type == "cat" else 1
+    )
+    platform = entity_platform.async_get_current_platform()
+    lag = _LoopLag(hass.loop, SETUP_LAG_INTERVAL)
+    start = time.perf_counter()
+    longest_chunk = 0.0
+    chunks = 0
+    try:
+        for offset in range(0, len(devices), SETUP_CHUNK_SIZE):
+            chunk_start = time.perf_counter()
+            await platform.async_add_entities(
+                [
+                    PiwigoWallDisplaySwitch(coordinator, device, "state")
+                    for device in devices[offset : offset + SETUP_CHUNK_SIZE]
+                ]
+            )
+            longest_chunk = max(longest_chunk, time.perf_counter() - chunk_start)
+            chunks += 1
+            await asyncio.sleep(0)
+    finally:
+        lag.stop()
+
+    coordinator.setup_stats["switch"] = {
+        "entities": len(devices),
+        "chunks": chunks,
+        "setup_seconds": round(time.perf_counter() - start, 4),
+        "longest_chunk_seconds": round(longest_chunk, 4),
+        "longest_stall_seconds": round(lag.longest, 4),
+    }
+    _LOGGER.debug("Switch setup: %s", coordinator.setup_stats["switch"])
+
+
+class _LoopLag:
+    """Longest delay of a callback the event loop should run every interval.
+
+    The delay is how long the loop was held by other work, the entity adds
+    and state writes included.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float) -> None:
+        """Start sampling."""
+        self.longest = 0.0
+        self._loop = loop
+        self._interval = interval
+        due = loop.time() + interval
+        self._handle = loop.call_at(due, self._tick, due)
+
+    def _tick(self, due: float) -> None:
+        """Record how late this callback ran and schedule the next."""
+        now = self._loop.time()
+        self.longest = max(self.longest, now - due)
+        self._handle = self._loop.call_at(
+            now + self._interval, self._tick, now + self._interval
+        )
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self._handle.cancel()
+
+
+def _included_devices(
+    coordinator: PiwigoWallDisplayCoordinator, config_entry: ConfigEntry
+) -> list[Device]:
+    """Return the album and tag devices kept by the entity filter options."""
+    options = config_entry.options
+    patterns = options.get(CONF_INCLUDE_PATTERNS, DEFAULT_INCLUDE_PATTERNS)
+    parent_ids = options.get(CONF_PARENT_ALBUM_IDS, DEFAULT_PARENT_ALBUM_IDS)
+    return coordinator.data.index.filter_devices(
+        max_depth=options.get(CONF_MAX_ALBUM_DEPTH, DEFAULT_MAX_ALBUM_DEPTH),
+        patterns=[p.strip() for p in patterns.split(",") if p.strip()],
+        parent_ids=[int(i) for i in parent_ids.split(",") if i.strip()],
+    )
+
+
+def _remove_excluded_switches(
+    hass: HomeAssistant, config_entry: ConfigEntry, devices: list[Device]
+) -> None:
+    """Remove registry entries of switches no longer created."""
+    registry = er.async_get(hass)
+    wanted = {f"{DOMAIN}-{device.device_unique_id}" for device in devices}
+    for entry in er.async_entries_for_config_entry(registry, config_entry.entry_id):
+        if entry.domain == "switch" and entry.unique_id not in wanted:
+            registry.async_remove(entry.entity_id)
 
 
 class PiwigoWallDisplaySwitch(CoordinatorEntity, SwitchEntity):
@@ -61,6 +162,10 @@ class PiwigoWallDisplaySwitch(CoordinatorEntity, SwitchEntity):
 
     _attr_has_entity_name = True
 
+    # These only change when an album is moved or renamed, keep them out of the
+    # recorder so every state write does not store them again.
+    _unrecorded_attributes = frozenset({"simple_name", "Album_Id", "Parent_Album_Id"})
+
     def __init__(
         self, coordinator: PiwigoWallDisplayCoordinator, device: Device, parameter: str
     ) -> None:
@@ -69,126 +174,82 @@ class PiwigoWallDisplaySwitch(CoordinatorEntity, SwitchEntity):
         self.device = device
         self.device_id = device.device_id
         self.parameter = parameter
+        self._written_available: bool | None = None
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Update sensor with latest data from coordinator."""
-        # This method is called by your DataUpdateCoordinator when a successful update runs.
-        self.device = self.coordinator.get_device_by_id(
-            self.device.device_type, self.device.device_unique_id
-        )
-        _LOGGER.debug("Device: %s", self.device)
-        self.async_write_ha_state()
-
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information."""
+        # ----------------------------------------------------------------------------
+        # All entities must have a unique id across your whole Home Assistant server.
+        # Think carefully what you want this to be as changing it later will cause HA
+        # to create new entities.
+        #
+        # The unique id and device info never change for a device, so they are
+        # built once here instead of on every state write.
+        # ----------------------------------------------------------------------------
+        self._attr_unique_id = f"{DOMAIN}-{device.device_unique_id}"
 
         # ----------------------------------------------------------------------------
         # Identifiers are what group entities into the same device.
-        # If your device is created elsewhere, you can just specify the indentifiers
-        # parameter to link an entity to a device.
-        # If your device connects via another device, add via_device parameter with
-        # the indentifiers of that device.
-        #
         # Device identifiers should be unique, so use your integration name (DOMAIN)
         # and a device uuid, mac address or some other unique attribute.
         # ----------------------------------------------------------------------------
-        return DeviceInfo(
-            name=f"Wall Display Options{self.device.device_id}",
+        self._attr_device_info = DeviceInfo(
+            name=f"Wall Display Options{device.device_id}",
             manufacturer="ACME Manufacturer",
             model="piwigo",
             sw_version="1.0",
             identifiers={
                 (
                     DOMAIN,
-                    f"{self.coordinator.data.controller_name}-{self.device.device_id}",
+                    f"{coordinator.data.controller_name}-{device.device_id}",
                 )
             },
         )
+        self._update_from_device()
 
-    @property
-    def name(self) -> str:
-        """Return the name of the sensor."""
-        return self.device.name  # self.parameter.replace("_", " ").title()
+    async def async_added_to_hass(self) -> None:
+        """Remember the availability of the first state write, made next."""
+        await super().async_added_to_hass()
+        self._written_available = self.available
 
-    @property
-    def unique_id(self) -> str:
-        """Return unique id."""
-
-        # ----------------------------------------------------------------------------
-        # All entities must have a unique id across your whole Home Assistant server -
-        # and that also goes for anyone using your integration who may have many other
-        # integrations loaded.
-        #
-        # Think carefully what you want this to be as changing it later will cause HA
-        # to create new entities.
-        #
-        # It is recommended to have your integration name (DOMAIN), some unique id
-        # from your device such as a UUID, MAC address etc (not IP address) and then
-        # something unique to your entity (like name - as this would be unique on a
-        # device)
-        #
-        # If in your situation you have some hub that connects to devices which then
-        # you want to create multiple sensors for each device, you would do something
-        # like.
-        #
-        # f"{DOMAIN}-{HUB_MAC_ADDRESS}-{DEVICE_UID}-{ENTITY_NAME}""
-        #
-        # This is even more important if your integration supports multiple instances.
-        # ----------------------------------------------------------------------------
-        return f"{DOMAIN}-{self.device.device_unique_id}"
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update sensor with latest data from coordinator."""
+        # This method is called by your DataUpdateCoordinator when a successful update runs.
+        device = self.coordinator.get_device_by_id(
+            self.device.device_type, self.device.device_unique_id
+        )
+        if device is not None and device != self.device:
+            self.device = device
+            self._update_from_device()
+            _LOGGER.debug("Device: %s", self.device)
+        elif self.available == self._written_available:
+            # Most refreshes change nothing for a given album, skip the state write.
+            return
+        self._written_available = self.available
+        self.async_write_ha_state()
 
-    @property
-    def is_on(self) -> bool | None:
-        """Return if the binary sensor is on."""
-        # This needs to enumerate to true or false
-        # self_device=dict(self.device)
-        return self.device.state
+    def _update_from_device(self) -> None:
+        """Set the entity attributes from the current device."""
+        self._attr_name = self.device.name
+        self._attr_is_on = bool(self.device.state)
+        attrs = {"simple_name": self.device.simple_name}
+        if self.device.piwigo_type == "cat":
+            attrs["Album_Id"] = self.device.piwigo_id
+            attrs["Parent_Album_Id"] = self.device.piwigo_parent_id
+        self._attr_extra_state_attributes = attrs
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the entity on."""
         # print(f"Time Zone= {self.hass.config.time_zone}")
-        await self.hass.async_add_executor_job(self.coordinator.api.connect)
-        await self.hass.async_add_executor_job(
-            self.coordinator.api.set_data,
-            self.device,
-            "true",  # self.device_id, self.parameter, "ON"
-        )
         # ----------------------------------------------------------------------------
-        # Use async_refresh on the DataUpdateCoordinator to perform immediate update.
-        # Using self.async_update or self.coordinator.async_request_refresh may delay update due
-        # to trying to batch requests.
+        # The coordinator writes the change and refreshes immediately, or batches it
+        # with other changes made within the batch window option.
         # ----------------------------------------------------------------------------
-        await self.coordinator.async_refresh()
+        await self.coordinator.async_set_device(self.device, "true")
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the entity off."""
-        await self.hass.async_add_executor_job(self.coordinator.api.connect)
-        await self.hass.async_add_executor_job(
-            self.coordinator.api.set_data,
-            self.device,
-            "false",  # self.device_id, self.parameter, "OFF"
-        )
         # ----------------------------------------------------------------------------
-        # Use async_refresh on the DataUpdateCoordinator to perform immediate update.
-        # Using self.async_update or self.coordinator.async_request_refresh may delay update due
-        # to trying to batch requests.
+        # The coordinator writes the change and refreshes immediately, or batches it
+        # with other changes made within the batch window option.
         # ----------------------------------------------------------------------------
-        await self.coordinator.async_refresh()
-
-    @property
-    def extra_state_attributes(self):
-        """Return the extra state attributes."""
-        # Add any additional attributes you want on your sensor.
-        attrs = {}
-        #    attrs["last_rebooted"] = self.coordinator.get_device_parameter(
-        #        self.device_id, "last_reboot"
-        #    )
-        # attrs["last_seen"] = datetime.utcnow()
-        attrs["simple_name"] = self.device.simple_name
-        if self.device.piwigo_id != 0:
-            attrs["Album_Id"] = self.device.piwigo_id
-            attrs["Parent_Album_Id"] = self.device.piwigo_parent_id
-        # print(self.device)
-        return attrs
+        await self.coordinator.async_set_device(self.device, "false")
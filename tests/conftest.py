@@ -0,0 +1,108 @@
+"""Fixtures for Piwigo Wall Display tests.
+
+The repository is the integration package itself, so it is linked into a
+custom_components package for Home Assistant to load it from.
+"""
+
+import json
+from pathlib import Path
+import sys
+import tempfile
+
+import pytest
+
+_CUSTOM_COMPONENTS = Path(tempfile.mkdtemp()) / "custom_components"
+_CUSTOM_COMPONENTS.mkdir()
+(_CUSTOM_COMPONENTS / "__init__.py").touch()
+(_CUSTOM_COMPONENTS / "piwigo_photo_display_options").symlink_to(
+    Path(__file__).parents[1], target_is_directory=True
+)
+sys.path.insert(0, str(_CUSTOM_COMPONENTS.parent))
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """Run async tests and fixtures on the Home Assistant test loop."""
+    config.option.asyncio_mode = "auto"
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable custom integrations in every test."""
+    return
+
+
+FULL_TABLE = {
+    "cats": {
+        "1": {
+            "id": 1,
+            "name": "Holidays",
+            "Enabled": "1",
+            "id_uppercat": None,
+            "children": {
+                "2": {
+                    "id": 2,
+                    "name": "Beach",
+                    "Enabled": "0",
+                    "id_uppercat": 1,
+                    "children": {},
+                }
+            },
+        }
+    },
+    "tags": {"1": {"id": 1, "name": "Family", "Enabled": "1"}},
+    "mode": "cat",
+}
+
+
+@pytest.fixture
+def config_entry(hass):
+    """Return a config entry added to hass."""
+    # pylint: disable-next=import-outside-toplevel
+    from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+    entry = MockConfigEntry(
+        domain="piwigo_photo_display_options",
+        title="Piwigo Wall Display Integration - http://piwigo.local",
+        unique_id="Piwigo Wall Display Integration - http://piwigo.local",
+        data={
+            "host": "http://piwigo.local",
+            "username": "user",
+            "password": "secret",
+        },
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+@pytest.fixture
+def mock_api():
+    """Patch the Piwigo calls of the API, returning FULL_TABLE."""
+    # pylint: disable-next=import-outside-toplevel
+    from unittest.mock import patch
+
+    # pylint: disable-next=import-outside-toplevel
+    from custom_components.piwigo_photo_display_options.api import API
+
+    def get_full_table(api: API) -> bytes:
+        api.connected = True
+        return json.dumps(FULL_TABLE).encode()
+
+    with (
+        patch.object(API, "connect", return_value=True) as connect,
+        patch.object(
+            API, "get_full_table", autospec=True, side_effect=get_full_table
+        ) as get_full_table,
+        patch.object(API, "ensure_logged_in"),
+        patch.object(API, "get_images_page", return_value=([], 0)),
+        patch.object(API, "get_album_image_ids", return_value=[]),
+        patch.object(API, "get_tag_image_ids", return_value=[]),
+        patch.object(API, "set_data", return_value=False),
+    ):
+        yield {"connect": connect, "get_full_table": get_full_table}
+
+
+@pytest.fixture
+def stored_snapshot(hass_storage, config_entry):
+    """Store FULL_TABLE as the snapshot of the last run."""
+    key = f"piwigo_photo_display_options.{config_entry.entry_id}.snapshot"
+    hass_storage[key] = {"version": 1, "key": key, "data": FULL_TABLE}
@@ -0,0 +1,43 @@
+"""Tests for the config flow."""
+
+from unittest.mock import patch
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.piwigo_photo_display_options.config_flow import InvalidAuth
+
+
+async def test_reauth_updates_credentials(
+    hass: HomeAssistant, config_entry, mock_api
+) -> None:
+    """New credentials are checked, stored and the entry reloaded."""
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    result = await config_entry.start_reauth_flow(hass)
+    assert result["step_id"] == "reauth_confirm"
+
+    with patch(
+        "custom_components.piwigo_photo_display_options.config_flow.validate_input",
+        side_effect=InvalidAuth,
+    ):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_USERNAME: "user", CONF_PASSWORD: "wrong"}
+        )
+    assert result["errors"] == {"base": "invalid_auth"}
+
+    with patch(
+        "custom_components.piwigo_photo_display_options.config_flow.validate_input",
+        return_value={"title": config_entry.title},
+    ) as validate:
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_USERNAME: "user", CONF_PASSWORD: "right"}
+        )
+        await hass.async_block_till_done()
+    assert result["type"] is FlowResultType.ABORT
+    assert result["reason"] == "reauth_successful"
+    assert validate.call_args.args[1]["host"] == "http://piwigo.local"
+    assert config_entry.data[CONF_PASSWORD] == "right"
+    assert config_entry.state is ConfigEntryState.LOADED
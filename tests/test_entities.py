@@ -0,0 +1,118 @@
+"""Tests for the state writes and recorded attributes of the entities."""
+
+import json
+
+from homeassistant.components.recorder.db_schema import StateAttributes
+from homeassistant.const import EVENT_STATE_CHANGED, EVENT_STATE_REPORTED
+from homeassistant.core import Event, HomeAssistant, State, callback
+
+from custom_components.piwigo_photo_display_options.api import API
+from custom_components.piwigo_photo_display_options.const import DOMAIN
+
+ALBUMS = 1000
+
+
+def _large_table(enabled: int = 0) -> dict:
+    """Return a full_table of ALBUMS albums in groups of ten, one tag."""
+    cats = {}
+    for parent in range(1, ALBUMS + 1, 10):
+        cats[str(parent)] = {
+            "id": parent,
+            "name": f"Album {parent}",
+            "Enabled": "1" if parent == enabled else "0",
+            "id_uppercat": None,
+            "children": {
+                str(child): {
+                    "id": child,
+                    "name": f"Album {child}",
+                    "Enabled": "1" if child == enabled else "0",
+                    "id_uppercat": parent,
+                    "children": {},
+                }
+                for child in range(parent + 1, parent + 10)
+            },
+        }
+    return {
+        "cats": cats,
+        "tags": {"1": {"id": 1, "name": "Family", "Enabled": "1"}},
+        "mode": "cat",
+    }
+
+
+def _serve(table: dict):
+    """Return a get_full_table replacement serving table."""
+
+    def get_full_table(api: API) -> bytes:
+        api.connected = True
+        return json.dumps(table).encode()
+
+    return get_full_table
+
+
+def _entity_writes(events: list[Event]) -> list[str]:
+    """Return the switch and select entity ids written by events."""
+    return [
+        event.data["entity_id"]
+        for event in events
+        if event.data["entity_id"].split(".")[0] in ("switch", "select")
+    ]
+
+
+async def test_unchanged_refresh_writes_nothing(
+    hass: HomeAssistant, config_entry, mock_api
+) -> None:
+    """Only entities whose album changed write their state on a refresh."""
+    mock_api["get_full_table"].side_effect = _serve(_large_table())
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id].coordinator
+    assert len(hass.states.async_entity_ids("switch")) == ALBUMS + 1
+
+    events: list[Event] = []
+    for event_type in (EVENT_STATE_CHANGED, EVENT_STATE_REPORTED):
+        hass.bus.async_listen(
+            event_type, events.append, event_filter=callback(lambda _: True)
+        )
+
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert _entity_writes(events) == []
+
+    mock_api["get_full_table"].side_effect = _serve(_large_table(enabled=5))
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert len(_entity_writes(events)) == 1
+
+
+async def test_static_attributes_not_recorded(
+    hass: HomeAssistant, config_entry, mock_api
+) -> None:
+    """The recorder leaves out the attributes that only change with the album."""
+    mock_api["get_full_table"].side_effect = _serve(_large_table())
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    recorded = unfiltered = 0
+    for entity_id in hass.states.async_entity_ids(("switch", "select")):
+        state = hass.states.get(entity_id)
+        recorded += len(_shared_attrs(state))
+        unfiltered += len(
+            _shared_attrs(State(entity_id, state.state, state.attributes))
+        )
+    for attribute in ("simple_name", "Album_Id", "Parent_Album_Id"):
+        assert attribute.encode() not in _shared_attrs(
+            hass.states.get(hass.states.async_entity_ids("switch")[0])
+        )
+    # Measured at 98730 of 161287 bytes, the friendly names remain.
+    assert recorded < unfiltered * 0.65
+
+
+def _shared_attrs(state: State) -> bytes:
+    """Return the attributes the recorder would store for state."""
+    return StateAttributes.shared_attrs_bytes_from_event(
+        Event(
+            EVENT_STATE_CHANGED,
+            {"entity_id": state.entity_id, "old_state": None, "new_state": state},
+        ),
+        None,
+    )
@@ -0,0 +1,30 @@
+"""Tests for the wall image disk cache."""
+
+from pathlib import Path
+
+from custom_components.piwigo_photo_display_options.image_cache import DiskLRUCache
+
+
+def test_hits_count_download_bytes(tmp_path: Path) -> None:
+    """A hit saves the size of the download, not of the cached file."""
+    cache = DiskLRUCache(str(tmp_path), 1024)
+    cache.put("1_800x480.jpg", b"x" * 100, 5000)
+    assert cache.get("1_800x480.jpg") == b"x" * 100
+    assert cache.get("2_800x480.jpg") is None
+    assert cache.stats()["cache_bytes_saved"] == 5000
+
+    # Sizes survive a restart.
+    cache = DiskLRUCache(str(tmp_path), 1024)
+    assert cache.get("1_800x480.jpg") == b"x" * 100
+    assert cache.stats()["cache_bytes_saved"] == 5000
+    assert cache.stats()["cache_size_bytes"] == 100
+
+
+def test_evicts_least_recently_used(tmp_path: Path) -> None:
+    """Files over max_bytes are removed oldest first."""
+    cache = DiskLRUCache(str(tmp_path), 250)
+    for image_id in range(3):
+        cache.put(f"{image_id}.jpg", b"x" * 100, 1000)
+    assert "0.jpg" not in cache
+    assert cache.stats()["cache_files"] == 2
+    assert len(list(tmp_path.iterdir())) == 2
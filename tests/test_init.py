@@ -0,0 +1,75 @@
+"""Tests for setting up and unloading a config entry."""
+
+import sqlite3
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.config_entries import SOURCE_REAUTH, ConfigEntryState
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+
+from custom_components.piwigo_photo_display_options.api import APIAuthError
+from custom_components.piwigo_photo_display_options.const import DOMAIN
+from custom_components.piwigo_photo_display_options.image_index import ImageIndex
+
+
+async def test_snapshot_start_checks_credentials(
+    hass: HomeAssistant, config_entry, mock_api, stored_snapshot
+) -> None:
+    """Entities started from a snapshot go unavailable on bad credentials."""
+    mock_api["get_full_table"].side_effect = APIAuthError("Invalid password")
+
+    await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    states = [
+        hass.states.get(entity_id)
+        for entity_id in hass.states.async_entity_ids("switch")
+    ]
+    assert states
+    assert all(state.state == STATE_UNAVAILABLE for state in states)
+    flows = hass.config_entries.flow.async_progress_by_handler(DOMAIN)
+    assert [flow["context"]["source"] for flow in flows] == [SOURCE_REAUTH]
+
+
+async def test_unload_while_index_opens(
+    hass: HomeAssistant, config_entry, mock_api
+) -> None:
+    """An index that finishes opening after the unload is closed again."""
+    opening = threading.Event()
+    release = threading.Event()
+    opened: list[ImageIndex] = []
+
+    def open_index(path: str) -> ImageIndex:
+        opening.set()
+        release.wait(5)
+        opened.append(ImageIndex(path))
+        return opened[-1]
+
+    with patch(
+        "custom_components.piwigo_photo_display_options.image_index.ImageIndex",
+        side_effect=open_index,
+    ):
+        await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_add_executor_job(opening.wait, 5)
+        coordinator = hass.data[DOMAIN][config_entry.entry_id].coordinator
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+        release.set()
+        await hass.async_block_till_done()
+
+    assert config_entry.state is ConfigEntryState.NOT_LOADED
+    assert coordinator.image_index is None
+    # The opening thread outlives the cancelled sync, wait for it to close.
+    for _ in range(50):
+        if opened:
+            try:
+                opened[0]._db.execute("SELECT 1")  # noqa: SLF001
+            except sqlite3.ProgrammingError:
+                return
+        time.sleep(0.1)
+    pytest.fail("image index left open")
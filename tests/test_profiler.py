@@ -0,0 +1,21 @@
+"""Tests for the profiler."""
+
+import cProfile
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.piwigo_photo_display_options import profiler
+
+
+async def test_cprofile_already_active(hass: HomeAssistant) -> None:
+    """A profiler that is already active is reported and the lock released."""
+    other = cProfile.Profile()
+    other.enable()
+    try:
+        with pytest.raises(RuntimeError, match="cProfile cannot be started"):
+            await profiler.async_profile(hass, [], 1, "cprofile")
+    finally:
+        other.disable()
+    assert not profiler._PROFILE_LOCK.locked()  # noqa: SLF001
@@ -0,0 +1,50 @@
+"""Tests for the random image sampler."""
+
+import random
+
+import pytest
+
+from custom_components.piwigo_photo_display_options.sampler import ImageSampler
+
+PREFETCH_SIZE = 10
+
+
+def _min_repeat_gap(shown: list[int]) -> int:
+    """Return the fewest images between two showings of the same image."""
+    last: dict[int, int] = {}
+    gap = len(shown)
+    for position, image_id in enumerate(shown):
+        if image_id in last:
+            gap = min(gap, position - last[image_id])
+        last[image_id] = position
+    return gap
+
+
+@pytest.mark.parametrize("count", [PREFETCH_SIZE + 1, PREFETCH_SIZE + 5, 50])
+def test_no_repeat_within_queue_depth(count: int) -> None:
+    """Images of a selection larger than the queue wait at least a queue."""
+    for seed in range(20):
+        sampler = ImageSampler(PREFETCH_SIZE, random.Random(seed))
+        sampler.set_sources(
+            {"cat:1": list(range(count // 2)), "cat:2": list(range(count // 2, count))}
+        )
+        shown = [sampler.next_image() for _ in range(count * 20)]
+        assert _min_repeat_gap(shown) >= PREFETCH_SIZE
+
+
+@pytest.mark.parametrize("count", [3, 5, PREFETCH_SIZE])
+def test_small_selection_reshuffled(count: int) -> None:
+    """A selection no bigger than the queue is not shown in one fixed order."""
+    sampler = ImageSampler(PREFETCH_SIZE, random.Random(0))
+    sampler.set_sources({"cat:1": list(range(count))})
+    shown = [sampler.next_image() for _ in range(count * 20)]
+    assert all(a != b for a, b in zip(shown, shown[1:]))
+    cycles = {tuple(shown[i : i + count]) for i in range(0, len(shown), count)}
+    assert len(cycles) > 1
+
+
+def test_single_image_repeats() -> None:
+    """A single image is shown every time."""
+    sampler = ImageSampler(PREFETCH_SIZE, random.Random(0))
+    sampler.set_sources({"tag:1": [7]})
+    assert [sampler.next_image() for _ in range(4)] == [7, 7, 7, 7]